@@ -18,7 +18,11 @@ if [ "$INSTALL_RUST" = "true" ]; then
     . $HOME/.cargo/env
 fi
 
-if [ -f "pyproject.toml" ]; then
+if [ -n "$PACKAGES" ]; then
+    # Installed together so that packages depending on each other resolve to
+    # the local copies rather than to PyPI
+    uv pip install $PACKAGES
+elif [ -f "pyproject.toml" ]; then
     uv pip install .
 else
     for dir in */; do
@@ -2,6 +2,7 @@ from .node import create_node
 from .model import create_model
 from .utils import get_sui_client
 from .utils import get_sui_client_with_airdrop
+from .gas import GasEstimator, gas_estimator
 from .cluster import (
     create_cluster,
     create_agent_for_cluster,
@@ -17,6 +18,8 @@ __all__ = [
     "create_node",
     "create_task",
     "execute_cluster",
+    "gas_estimator",
+    "GasEstimator",
     "get_cluster_execution_response",
     "get_sui_client",
     "get_sui_client_with_airdrop",
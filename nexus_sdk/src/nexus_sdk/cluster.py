@@ -4,24 +4,22 @@ from pysui.sui.sui_types.scalars import ObjectID, SuiString
 import time
 import ast
 import traceback
-
-# Equal to 1 SUI which should be enough for most transactions.
-GAS_BUDGET = 1000000000
+from .gas import GAS_BUDGET, arguments_size, gas_estimator
 
 
 # Creates an empty cluster object to which agents and tasks can be added.
 # See functions [create_agent_for_cluster] and [create_task].
 #
 # Returns the cluster ID and the cluster owner capability ID.
-def create_cluster(client, package_id, name, description, gas_budget=GAS_BUDGET):
+def create_cluster(client, package_id, name, description, gas_budget=None):
     txn = SuiTransaction(client=client)
 
     try:
-        result = txn.move_call(
-            target=f"{package_id}::cluster::create",
-            arguments=[SuiString(name), SuiString(description)],
-        )
-        result = txn.execute(gas_budget=gas_budget)
+        target = f"{package_id}::cluster::create"
+        arguments = [SuiString(name), SuiString(description)]
+        size = arguments_size(arguments)
+        result = txn.move_call(target=target, arguments=arguments)
+        result = gas_estimator.execute(txn, target, size, gas_budget)
         if result.is_ok():
             if result.result_data.effects.status.status == "success":
                 # just because it says "parsed_json" doesn't mean it's actually valid JSON apparently
@@ -52,25 +50,25 @@ def create_agent_for_cluster(
     role,
     goal,
     backstory,
-    gas_budget=GAS_BUDGET,
+    gas_budget=None,
 ):
     txn = SuiTransaction(client=client)
 
     try:
-        result = txn.move_call(
-            target=f"{package_id}::cluster::add_agent_entry",
-            arguments=[
-                ObjectID(cluster_id),
-                ObjectID(cluster_owner_cap_id),
-                ObjectID(model_id),
-                ObjectID(model_owner_cap_id),
-                SuiString(name),
-                SuiString(role),
-                SuiString(goal),
-                SuiString(backstory),
-            ],
-        )
-        result = txn.execute(gas_budget=gas_budget)
+        target = f"{package_id}::cluster::add_agent_entry"
+        arguments = [
+            ObjectID(cluster_id),
+            ObjectID(cluster_owner_cap_id),
+            ObjectID(model_id),
+            ObjectID(model_owner_cap_id),
+            SuiString(name),
+            SuiString(role),
+            SuiString(goal),
+            SuiString(backstory),
+        ]
+        size = arguments_size(arguments)
+        result = txn.move_call(target=target, arguments=arguments)
+        result = gas_estimator.execute(txn, target, size, gas_budget)
         if result.is_ok():
             return True
         print(f"Failed to add Agent: {result.result_string}")
@@ -93,25 +91,25 @@ def create_task(
     expected_output,
     prompt,
     context,
-    gas_budget=GAS_BUDGET,
+    gas_budget=None,
 ):
     txn = SuiTransaction(client=client)
 
     try:
-        result = txn.move_call(
-            target=f"{package_id}::cluster::add_task_entry",
-            arguments=[
-                ObjectID(cluster_id),
-                ObjectID(cluster_owner_cap_id),
-                SuiString(name),
-                SuiString(agent_name),
-                SuiString(description),
-                SuiString(expected_output),
-                SuiString(prompt),
-                SuiString(context),
-            ],
-        )
-        result = txn.execute(gas_budget=gas_budget)
+        target = f"{package_id}::cluster::add_task_entry"
+        arguments = [
+            ObjectID(cluster_id),
+            ObjectID(cluster_owner_cap_id),
+            SuiString(name),
+            SuiString(agent_name),
+            SuiString(description),
+            SuiString(expected_output),
+            SuiString(prompt),
+            SuiString(context),
+        ]
+        size = arguments_size(arguments)
+        result = txn.move_call(target=target, arguments=arguments)
+        result = gas_estimator.execute(txn, target, size, gas_budget)
         if result.is_ok():
             return True
         print(f"Failed to add Task: {result.result_string}")
@@ -130,21 +128,21 @@ def execute_cluster(
     package_id,
     cluster_id,
     input,
-    gas_budget=GAS_BUDGET,
+    gas_budget=None,
 ):
     txn = SuiTransaction(client=client)
 
+    target = f"{package_id}::cluster::execute"
+    arguments = [ObjectID(cluster_id), SuiString(input)]
+    size = arguments_size(arguments)
     try:
-        result = txn.move_call(
-            target=f"{package_id}::cluster::execute",
-            arguments=[ObjectID(cluster_id), SuiString(input)],
-        )
+        result = txn.move_call(target=target, arguments=arguments)
     except Exception as e:
         print(f"Error in execute_cluster: {e}")
         traceback.print_exc()
         return None
 
-    result = txn.execute(gas_budget=gas_budget)
+    result = gas_estimator.execute(txn, target, size, gas_budget)
 
     if result.is_ok():
         if result.result_data.effects.status.status == "success":
@@ -0,0 +1,122 @@
+import logging
+import math
+import time
+from pysui.sui.sui_txresults.complex_tx import TxInspectionResult
+from pysui.sui.sui_types.scalars import SuiString
+
+logger = logging.getLogger(__name__)
+
+# Equal to 1 SUI which should be enough for most transactions.
+# Used when a transaction cannot be dry-run and as the upper bound of estimates.
+GAS_BUDGET = 1000000000
+
+# Sui rejects budgets below the minimum computation cost, so never go under this.
+MIN_GAS_BUDGET = 2000000
+
+
+# Sums the size in bytes of the string arguments of a move call.
+# Storage cost grows with it, so it is part of the estimate cache key.
+def arguments_size(arguments):
+    size = 0
+    for arg in arguments:
+        if isinstance(arg, SuiString):
+            arg = arg.value
+        if isinstance(arg, str):
+            size += len(arg.encode())
+    return size
+
+
+# Estimates gas budgets by dry-running a transaction once per move call target
+# and argument size bucket, then reusing the observed cost with a safety margin.
+#
+# Locking the whole [GAS_BUDGET] for every transaction limits how many
+# transactions can be in flight per gas coin, realistic budgets do not.
+#
+# A bucket spans arguments of up to twice the size, so the cost kept for it
+# is scaled up for arguments larger than those it was observed with, and
+# executed transactions only ever raise it: a cheap small transaction must
+# not lower the budget of a large one below what it needs. Estimates are
+# dry-run again when they get old, which is how they come down.
+class GasEstimator:
+    def __init__(
+        self,
+        safety_margin=1.5,
+        max_age_s=600,
+        min_budget=MIN_GAS_BUDGET,
+        max_budget=GAS_BUDGET,
+    ):
+        self.safety_margin = safety_margin
+        self.max_age_s = max_age_s
+        self.min_budget = min_budget
+        self.max_budget = max_budget
+        # (target, size bucket) -> (observed cost, argument size, time of observation)
+        self._costs = {}
+
+    # Arguments are bucketed by powers of two so that a prompt a few bytes
+    # longer than the last one does not need another dry-run.
+    @staticmethod
+    def bucket(arg_size):
+        return max(int(arg_size), 1).bit_length()
+
+    def budget(self, txn, target, arg_size=0):
+        key = (target, self.bucket(arg_size))
+        cached = self._costs.get(key)
+        if cached is None or time.monotonic() - cached[2] > self.max_age_s:
+            cost = self._dry_run(txn)
+            if cost is None:
+                return self.max_budget
+            cached = self._costs[key] = (cost, max(int(arg_size), 1), time.monotonic())
+
+        budget = math.ceil(self._estimate(cached, arg_size) * self.safety_margin)
+        return min(max(budget, self.min_budget), self.max_budget)
+
+    # Records the cost of an executed transaction.
+    # Replaces the cached estimate only if the transaction cost more.
+    def observe(self, target, arg_size, effects):
+        key = (target, self.bucket(arg_size))
+        cost = effects.gas_used.total
+        cached = self._costs.get(key)
+        if cached is None or cost > self._estimate(cached, arg_size):
+            self._costs[key] = (cost, max(int(arg_size), 1), time.monotonic())
+
+    def invalidate(self, target, arg_size=0):
+        self._costs.pop((target, self.bucket(arg_size)), None)
+
+    # Executes the transaction with an estimated budget unless one is given
+    # and keeps the estimate for the target up to date.
+    def execute(self, txn, target, arg_size=0, gas_budget=None):
+        if not gas_budget:
+            gas_budget = self.budget(txn, target, arg_size)
+
+        result = txn.execute(gas_budget=gas_budget)
+        if result.is_ok():
+            effects = result.result_data.effects
+            if effects.status.status == "success":
+                self.observe(target, arg_size, effects)
+            elif "InsufficientGas" in (effects.status.error or ""):
+                self.invalidate(target, arg_size)
+        return result
+
+    # The cached cost scaled to arguments of [arg_size] bytes, never below it.
+    @staticmethod
+    def _estimate(cached, arg_size):
+        cost, observed_size, _ = cached
+        return cost * max(1.0, int(arg_size) / observed_size)
+
+    @staticmethod
+    def _dry_run(txn):
+        try:
+            inspection = txn.inspect_all()
+        except Exception as e:
+            logger.warning("Gas estimation dry-run failed: %s", e)
+            return None
+        if not isinstance(inspection, TxInspectionResult):
+            logger.warning(
+                "Gas estimation dry-run failed: %s", inspection.result_string
+            )
+            return None
+        return inspection.effects.gas_used.total
+
+
+# Shared estimator so that all transactions of a process share the cache.
+gas_estimator = GasEstimator()
@@ -2,6 +2,7 @@ from pysui.sui.sui_txn.sync_transaction import SuiTransaction
 from pysui.sui.sui_types.scalars import ObjectID, SuiU64, SuiU8, SuiString, SuiBoolean
 from pysui.sui.sui_types.collections import SuiArray
 import ast
+from .gas import arguments_size, gas_estimator
 
 
 # Creates a new on-chain model object.
@@ -43,11 +44,10 @@ def create_model(
         SuiArray([SuiString(dataset) for dataset in datasets]),
     ]
 
-    result = txn.move_call(
-        target=f"{package_id}::model::create",
-        arguments=args,
-    )
-    result = txn.execute(gas_budget=10000000)
+    target = f"{package_id}::model::create"
+    size = arguments_size(args)
+    result = txn.move_call(target=target, arguments=args)
+    result = gas_estimator.execute(txn, target, size)
 
     if result.is_ok():
         effects = result.result_data.effects
@@ -1,5 +1,6 @@
 from pysui.sui.sui_txn.sync_transaction import SuiTransaction
 from pysui.sui.sui_types.scalars import SuiU64
+from .gas import arguments_size, gas_estimator
 
 
 # Creates a new node owned object.
@@ -7,11 +8,11 @@ from pysui.sui.sui_types.scalars import SuiU64
 def create_node(client, package_id, name, node_type, gpu_memory):
     txn = SuiTransaction(client=client)
 
-    result = txn.move_call(
-        target=f"{package_id}::node::create",
-        arguments=[name, node_type, SuiU64(gpu_memory), "c", []],
-    )
-    result = txn.execute(gas_budget=10000000)
+    target = f"{package_id}::node::create"
+    arguments = [name, node_type, SuiU64(gpu_memory), "c", []]
+    size = arguments_size(arguments)
+    result = txn.move_call(target=target, arguments=arguments)
+    result = gas_estimator.execute(txn, target, size)
 
     if result.is_ok() or result._data.succeeded:
         node_id = result._data.effects.created[0].reference.object_id
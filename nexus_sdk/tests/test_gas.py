@@ -0,0 +1,81 @@
+"""
+tests for gas budget estimation in gas.py
+To run, execute "PYTHONPATH=src pytest tests/test_gas.py" from `nexus_sdk` directory
+"""
+
+from types import SimpleNamespace
+
+from pysui.sui.sui_types.scalars import SuiString
+
+from nexus_sdk.gas import GasEstimator, arguments_size
+
+TARGET = "0x1::cluster::add_completion"
+
+
+def effects(cost):
+    return SimpleNamespace(gas_used=SimpleNamespace(total=cost))
+
+
+class DryRunEstimator(GasEstimator):
+    def __init__(self, cost, **kwargs):
+        super().__init__(min_budget=1, **kwargs)
+        self.cost = cost
+        self.dry_runs = 0
+
+    def _dry_run(self, txn):
+        self.dry_runs += 1
+        return self.cost
+
+
+def test_arguments_size_counts_string_bytes():
+    assert arguments_size([SuiString("héllo"), "ab", 42]) == 8
+
+
+def test_budget_dry_runs_once_per_bucket():
+    estimator = DryRunEstimator(1000, safety_margin=1.5)
+    assert estimator.budget(None, TARGET, 100) == 1500
+    assert estimator.budget(None, TARGET, 100) == 1500
+    assert estimator.dry_runs == 1
+    estimator.budget(None, TARGET, 1000)
+    assert estimator.dry_runs == 2
+
+
+def test_budget_scales_to_larger_arguments_of_the_bucket():
+    estimator = DryRunEstimator(1000, safety_margin=1)
+    assert GasEstimator.bucket(70) == GasEstimator.bucket(127)
+    assert estimator.budget(None, TARGET, 70) == 1000
+    assert estimator.budget(None, TARGET, 127) == 1815
+    # Smaller arguments keep the cost observed with larger ones
+    assert estimator.budget(None, TARGET, 64) == 1000
+
+
+def test_cheap_transaction_does_not_lower_the_estimate():
+    estimator = DryRunEstimator(1000, safety_margin=1)
+    estimator.budget(None, TARGET, 120)
+    estimator.observe(TARGET, 65, effects(100))
+    assert estimator.budget(None, TARGET, 120) == 1000
+
+
+def test_costlier_transaction_raises_the_estimate():
+    estimator = DryRunEstimator(1000, safety_margin=1)
+    estimator.budget(None, TARGET, 100)
+    estimator.observe(TARGET, 100, effects(1400))
+    assert estimator.budget(None, TARGET, 100) == 1400
+    assert estimator.dry_runs == 1
+
+
+def test_old_estimates_are_dry_run_again():
+    estimator = DryRunEstimator(1000, safety_margin=1, max_age_s=0)
+    estimator.budget(None, TARGET, 100)
+    estimator.cost = 500
+    assert estimator.budget(None, TARGET, 100) == 500
+
+
+def test_failed_dry_run_falls_back_to_max_budget():
+    estimator = DryRunEstimator(None, max_budget=123)
+    assert estimator.budget(None, TARGET, 100) == 123
+
+
+def test_budget_is_clamped():
+    estimator = DryRunEstimator(10**12)
+    assert estimator.budget(None, TARGET) == estimator.max_budget
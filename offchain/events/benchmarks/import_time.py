@@ -0,0 +1,66 @@
+"""
+Measures the import time and memory of what the listener needs to know about
+tools: the static manifest versus the tool implementations.
+
+Each import runs in a fresh interpreter so that nothing is cached between
+runs. Run from the `offchain` directory with both packages installed:
+
+    python events/benchmarks/import_time.py --runs 5
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+CASES = {
+    "manifest": "from nexus_tools.server.tools.manifest import load_manifest; load_manifest()",
+    "tools": "from nexus_tools.server.tools.tools import TOOLS, TOOL_ARGS_MAPPING",
+    "listener": "import nexus_events.sui_event",
+}
+
+# Prints wall time of the statement and peak RSS of the interpreter in KiB
+TEMPLATE = """
+import resource, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def measure(statement):
+    output = subprocess.run(
+        [sys.executable, "-c", TEMPLATE.format(statement=statement)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    elapsed, max_rss = output.strip().splitlines()[-1].split()
+    return float(elapsed), int(max_rss)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("cases", nargs="*", default=list(CASES))
+    args = parser.parse_args()
+
+    print(
+        f"{'case':<10} {'median import s':>16} {'max import s':>13} {'peak RSS MiB':>13}"
+    )
+    for case in args.cases:
+        try:
+            samples = [measure(CASES[case]) for _ in range(args.runs)]
+        except subprocess.CalledProcessError as e:
+            print(f"{case:<10} failed: {e.stderr.strip().splitlines()[-1]}")
+            continue
+        times = [elapsed for elapsed, _ in samples]
+        rss = max(max_rss for _, max_rss in samples) / 1024
+        print(
+            f"{case:<10} {statistics.median(times):>16.3f} {max(times):>13.3f} {rss:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
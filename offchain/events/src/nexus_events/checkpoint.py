@@ -0,0 +1,91 @@
+import json
+import os
+from pathlib import Path
+from typing import List, Optional
+
+from pysui.sui.sui_types.collections import EventID
+
+from nexus_events.retry import PendingCompletion
+
+CURSOR_FILE = "cursor.json"
+JOURNAL_FILE = "journal.json"
+
+
+class Checkpoint:
+    """Where the listener left off.
+
+    `cursor` is the ID of the last event that was fully handled, i.e. whose
+    completion was either submitted or handed to the retry queue. The journal
+    holds completions that were inferred but not yet accepted onchain when the
+    listener stopped. Both are kept in `state_dir`, if there is none they only
+    live in memory.
+
+    The journal is only replaced once its completions were submitted, or
+    queued again, so a crash while replaying it replays it once more.
+    """
+
+    def __init__(self, state_dir: Optional[str] = None):
+        self.state_dir = Path(state_dir) if state_dir else None
+        self.cursor: Optional[EventID] = None
+
+    def load(self) -> List[PendingCompletion]:
+        """Restores the cursor and returns the journaled completions.
+
+        The journal is left in place, call `save_journal` with what is still
+        unsubmitted once the completions were replayed.
+        """
+        if self.state_dir is None:
+            return []
+
+        cursor = self._read(CURSOR_FILE)
+        if cursor:
+            self.cursor = EventID(cursor["eventSeq"], cursor["txDigest"])
+
+        journal = self._read(JOURNAL_FILE) or []
+        return [
+            PendingCompletion(
+                item["cluster_execution_id"],
+                item["completion"],
+                attempts=item.get("attempts", 0),
+            )
+            for item in journal
+        ]
+
+    def save_cursor(self):
+        if self.state_dir is not None and self.cursor is not None:
+            self._write(CURSOR_FILE, self.cursor.map)
+
+    def save_journal(self, pending: List[PendingCompletion]):
+        """Replaces the journal, removes it if nothing is pending."""
+        if self.state_dir is None:
+            return
+        if not pending:
+            (self.state_dir / JOURNAL_FILE).unlink(missing_ok=True)
+            return
+
+        # Backoff deadlines are monotonic clock readings, meaningless to the
+        # next process, so only what is needed to resubmit is kept
+        journal = [
+            {
+                "cluster_execution_id": item.cluster_execution_id,
+                "completion": item.completion,
+                "attempts": item.attempts,
+            }
+            for item in pending
+        ]
+        self._write(JOURNAL_FILE, journal)
+
+    def _read(self, name: str):
+        try:
+            with open(self.state_dir / name, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write(self, name: str, data):
+        # Write and rename so that a kill halfway does not leave a corrupt file
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_dir / f".{name}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.state_dir / name)
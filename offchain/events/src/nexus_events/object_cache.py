@@ -0,0 +1,115 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from pysui.sui.sui_clients.sync_client import SuiClient
+from pysui.sui.sui_txresults.common import GenericRef
+from pysui.sui.sui_txresults.complex_tx import Effects
+from pysui.sui.sui_txresults.single_tx import SharedOwner
+from pysui.sui.sui_types import bcs
+from pysui.sui.sui_types.scalars import ObjectID
+
+
+@dataclass
+class ObjectRef:
+    """What a transaction needs to know about an object to use it as an input."""
+
+    object_id: str
+    version: int
+    digest: str
+    # Only set for shared objects, whose input is keyed by this version
+    # instead of the current one and thus never goes stale.
+    initial_shared_version: Optional[int] = None
+
+    @property
+    def is_shared(self) -> bool:
+        return self.initial_shared_version is not None
+
+
+class ObjectRefCache:
+    """Local object reference cache for the completion transactions.
+
+    pysui looks up every `ObjectID` argument with an RPC call when a move call
+    is added to a transaction. The listener uses the same model owner cap and
+    a handful of cluster executions over and over, so we resolve them once,
+    keep the versions current from the transaction effects and hand pysui the
+    finished object arguments.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._refs: "OrderedDict[str, ObjectRef]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+    def get(self, client: SuiClient, object_id: str) -> ObjectRef:
+        ref = self._refs.get(object_id)
+        if ref is None:
+            ref = self._fetch(client, object_id)
+            self._refs[object_id] = ref
+            if len(self._refs) > self.max_entries:
+                self._refs.popitem(last=False)
+        else:
+            self._refs.move_to_end(object_id)
+        return ref
+
+    def argument(
+        self, client: SuiClient, object_id: str, mutable: bool = True
+    ) -> Tuple[bcs.BuilderArg, bcs.ObjectArg]:
+        """Returns an object input that `SuiTransaction.move_call` accepts as is."""
+        ref = self.get(client, object_id)
+        address = bcs.Address.from_str(ref.object_id)
+        if ref.is_shared:
+            object_arg = bcs.ObjectArg(
+                "SharedObject",
+                bcs.SharedObjectReference(address, ref.initial_shared_version, mutable),
+            )
+        else:
+            object_arg = bcs.ObjectArg(
+                "ImmOrOwnedObject",
+                bcs.ObjectReference.from_generic_ref(
+                    GenericRef(ref.object_id, ref.version, ref.digest)
+                ),
+            )
+        return bcs.BuilderArg("Object", address), object_arg
+
+    def update_from_effects(self, effects: Effects):
+        """Moves cached owned objects to the versions the transaction produced.
+
+        Effects of failed transactions must be applied as well because the
+        owned inputs are bumped to a new version even when execution aborts.
+        """
+        for owner_ref in effects.mutated or []:
+            ref = self._refs.get(owner_ref.reference.object_id)
+            if ref is not None and not ref.is_shared:
+                ref.version = owner_ref.reference.version
+                ref.digest = owner_ref.reference.digest
+        for deleted in (effects.deleted or []) + (effects.wrapped or []):
+            self._refs.pop(deleted.object_id, None)
+
+    def invalidate(self, *object_ids: str):
+        """Forgets the objects so that they are fetched again on next use."""
+        for object_id in object_ids:
+            self._refs.pop(object_id, None)
+
+    @staticmethod
+    def _fetch(client: SuiClient, object_id: str) -> ObjectRef:
+        result = client.get_object(ObjectID(object_id))
+        if result.is_err():
+            raise ValueError(f"Cannot fetch object {object_id}: {result.result_string}")
+
+        object_read = result.result_data
+        if not hasattr(object_read, "owner"):
+            raise ValueError(f"Cannot fetch object {object_id}: {object_read}")
+
+        initial_shared_version = None
+        if isinstance(object_read.owner, SharedOwner):
+            initial_shared_version = int(object_read.owner.initial_shared_version)
+
+        return ObjectRef(
+            object_id=object_read.object_id,
+            version=int(object_read.version),
+            digest=object_read.digest,
+            initial_shared_version=initial_shared_version,
+        )
@@ -1,15 +1,64 @@
-import requests
+import httpx
 import os
+import time
+from typing import Optional
 from dotenv import load_dotenv
+from nexus_events.transport import http_client
+import logging
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 LLM_ASSISTANT_URL = os.getenv("LLM_ASSISTANT_URL", "http://localhost:8080/predict")
 
+# How often a request rejected by the overloaded tools server is sent again,
+# and for how long at most to wait before each attempt
+LLM_ASSISTANT_MAX_ATTEMPTS = int(os.getenv("LLM_ASSISTANT_MAX_ATTEMPTS", "5"))
+LLM_ASSISTANT_MAX_RETRY_AFTER_S = float(
+    os.getenv("LLM_ASSISTANT_MAX_RETRY_AFTER_S", "30")
+)
+
+
+class InferenceError(Exception):
+    """The tools server could not complete the prompt."""
+
+
+class InferenceUnavailable(InferenceError):
+    """The tools server kept rejecting the prompt because it is overloaded.
+
+    The prompt can be sent again after `retry_after_s`.
+    """
+
+    def __init__(self, message: str, retry_after_s: float):
+        super().__init__(message)
+        self.retry_after_s = retry_after_s
+
+
+def retry_after_s(response: httpx.Response) -> float:
+    try:
+        seconds = float(response.headers.get("Retry-After", "1"))
+    except ValueError:
+        seconds = 1.0
+    return min(max(seconds, 0.0), LLM_ASSISTANT_MAX_RETRY_AFTER_S)
+
 
 class OffChain:
+    def __init__(
+        self,
+        max_attempts: int = LLM_ASSISTANT_MAX_ATTEMPTS,
+        sleep=time.sleep,
+    ):
+        self.max_attempts = max_attempts
+        self._sleep = sleep
+
     def process(
-        self, prompt: str, model_name: str, max_tokens: int, temperature: float
+        self,
+        prompt: str,
+        model_name: str,
+        max_tokens: int,
+        temperature: float,
+        prefix_key: Optional[str] = None,
     ) -> str:
         url = LLM_ASSISTANT_URL
         headers = {"Content-Type": "application/json"}
@@ -18,22 +67,45 @@ class OffChain:
             "model": model_name,
             "max_tokens": int(max_tokens),
             "temperature": temperature,
+            "prefix_key": prefix_key,
         }
 
         try:
-
-            response = requests.post(url, headers=headers, json=prompt_data)
+            client, url = http_client(url)
+            for attempt in range(1, self.max_attempts + 1):
+                response = client.post(url, headers=headers, json=prompt_data)
+                if response.status_code != 503:
+                    break
+                wait_s = retry_after_s(response)
+                if attempt == self.max_attempts:
+                    raise InferenceUnavailable(
+                        f"Tools server overloaded after {attempt} attempts: "
+                        f"{response.text}",
+                        wait_s,
+                    )
+                logger.warning(
+                    "Tools server overloaded, retrying in %.1fs (attempt %d/%d)",
+                    wait_s,
+                    attempt + 1,
+                    self.max_attempts,
+                )
+                self._sleep(wait_s)
             response.raise_for_status()
             result = response.json()
 
-            completion = result["completion"]
-            return completion
-        except requests.exceptions.RequestException as e:
+            logger.debug(
+                "completion by %s: %s prompt and %s completion tokens",
+                result.get("model"),
+                result.get("prompt_eval_count"),
+                result.get("eval_count"),
+            )
+            return result["completion"]
+        except httpx.HTTPError as e:
             msg = f"Error occurred while calling the API: {e}"
-            if hasattr(e, "response") and e.response is not None:
+            if isinstance(e, httpx.HTTPStatusError):
                 msg += f"\nResponse content: {e.response.text}"
-            print(msg)
-            raise Exception(status_code=500, detail=msg)
+            logger.error(msg)
+            raise InferenceError(msg) from e
 
 
 def main():
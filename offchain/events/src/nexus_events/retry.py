@@ -0,0 +1,146 @@
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Substrings (lowercased) of Sui errors that will never succeed on a retry,
+# e.g. the execution already has a completion or the arguments are malformed.
+PERMANENT_ERROR_MARKERS = [
+    "moveabort",
+    "commandargumenterror",
+    "typearitymismatch",
+    "invalidinput",
+    "unable to find target",
+    "unknown class type handler",
+]
+
+# Substrings (lowercased) of errors caused by contention or a flaky node.
+# These are worth retrying once object references and gas coins are refreshed.
+RETRYABLE_ERROR_MARKERS = [
+    "objectversionunavailableforconsumption",
+    "not available for consumption",
+    "objectnotfound",
+    "locked",
+    "objectlockconflict",
+    "transactionexpired",
+    "equivocat",
+    "timeout",
+    "timed out",
+    "connect",
+    "temporarily unavailable",
+    "too many requests",
+    "gas",
+    "insufficientcoinbalance",
+    "dry run failed",
+]
+
+
+def is_retryable_error(error: str) -> bool:
+    """Returns whether a failed completion submission is worth retrying.
+
+    Permanent markers win over retryable ones, and errors that match neither
+    list are treated as permanent so that bugs do not loop until the attempt
+    limit.
+    """
+    error = error.lower()
+    if any(marker in error for marker in PERMANENT_ERROR_MARKERS):
+        return False
+    return any(marker in error for marker in RETRYABLE_ERROR_MARKERS)
+
+
+@dataclass
+class PendingCompletion:
+    """A completion that has been inferred but not yet accepted onchain."""
+
+    cluster_execution_id: str
+    completion: str
+    attempts: int = 0
+    next_attempt_at: float = 0.0
+    last_error: str = ""
+
+
+class RetryQueue:
+    """Holds completions whose submission failed with a retryable error.
+
+    Delays grow exponentially with the number of attempts and are jittered so
+    that listeners racing for the same shared objects do not retry in lockstep.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        base_delay_s: float = 1.0,
+        max_delay_s: float = 60.0,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay_s = base_delay_s
+        self.max_delay_s = max_delay_s
+        self._pending: List[PendingCompletion] = []
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.max_delay_s, self.base_delay_s * 2 ** max(attempts - 1, 0))
+        return random.uniform(delay / 2, delay)
+
+    def push(self, item: PendingCompletion, error: str) -> bool:
+        """Schedules another attempt for the completion.
+
+        Returns False if the error is permanent or the completion ran out of
+        attempts, in which case it is dropped.
+        """
+        item.attempts += 1
+        item.last_error = error
+        if not is_retryable_error(error):
+            logger.error(
+                "Permanent error submitting completion for %s, dropping: %s",
+                item.cluster_execution_id,
+                error,
+            )
+            return False
+        if item.attempts >= self.max_attempts:
+            logger.error(
+                "Giving up on completion for %s after %d attempts: %s",
+                item.cluster_execution_id,
+                item.attempts,
+                error,
+            )
+            return False
+
+        delay = self.backoff(item.attempts)
+        item.next_attempt_at = time.monotonic() + delay
+        self._pending.append(item)
+        logger.warning(
+            "Retrying completion for %s in %.1fs (attempt %d/%d): %s",
+            item.cluster_execution_id,
+            delay,
+            item.attempts + 1,
+            self.max_attempts,
+            error,
+        )
+        return True
+
+    def defer(self, item: PendingCompletion):
+        """Queues the completion for an attempt right away without counting one."""
+        item.next_attempt_at = 0.0
+        self._pending.append(item)
+
+    def snapshot(self) -> List[PendingCompletion]:
+        """Returns all queued completions, leaving them queued."""
+        return list(self._pending)
+
+    def drain(self) -> List[PendingCompletion]:
+        """Removes and returns all queued completions, due or not."""
+        pending, self._pending = self._pending, []
+        return pending
+
+    def pop_due(self, now: Optional[float] = None) -> List[PendingCompletion]:
+        """Removes and returns all completions whose backoff has elapsed."""
+        now = time.monotonic() if now is None else now
+        due = [item for item in self._pending if item.next_attempt_at <= now]
+        self._pending = [item for item in self._pending if item.next_attempt_at > now]
+        return due
@@ -0,0 +1,68 @@
+import logging
+import math
+import signal
+
+logger = logging.getLogger(__name__)
+
+
+class GracePeriodExpired(BaseException):
+    """Raised in the main thread when in-flight work must be abandoned.
+
+    Derives from BaseException so that the `except Exception` blocks of the
+    event handlers do not swallow it.
+    """
+
+
+class GracefulShutdown:
+    """Turns SIGTERM and SIGINT into a drain of the listener.
+
+    The first signal sets `requested`, after which the listener stops fetching
+    new events and finishes the one in flight. If that takes longer than the
+    grace period, or a second signal arrives, GracePeriodExpired interrupts
+    whatever the listener is blocked on.
+    """
+
+    def __init__(self, grace_period_s: float = 30.0):
+        self.grace_period_s = grace_period_s
+        self.requested = False
+        self._previous = {}
+
+    def install(self):
+        for signum, handler in (
+            (signal.SIGTERM, self._handle),
+            (signal.SIGINT, self._handle),
+            (signal.SIGALRM, self._expire),
+        ):
+            self._previous[signum] = signal.signal(signum, handler)
+
+    def cancel(self):
+        """Stops the grace period and ignores further signals until `restore`.
+
+        Called before the final checkpoint so that neither a second signal nor
+        the alarm interrupts writing it.
+        """
+        signal.alarm(0)
+        for signum in self._previous:
+            signal.signal(signum, signal.SIG_IGN)
+
+    def restore(self):
+        """Puts back the handlers that were installed before `install`."""
+        for signum, handler in self._previous.items():
+            signal.signal(signum, signal.SIG_DFL if handler is None else handler)
+        self._previous = {}
+
+    def _handle(self, signum, frame):
+        if self.requested:
+            self._expire(signum, frame)
+
+        self.requested = True
+        logger.warning(
+            "Received %s, draining for up to %ss",
+            signal.Signals(signum).name,
+            self.grace_period_s,
+        )
+        signal.alarm(max(math.ceil(self.grace_period_s), 1))
+
+    def _expire(self, signum, frame):
+        signal.alarm(0)
+        raise GracePeriodExpired()
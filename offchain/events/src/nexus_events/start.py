@@ -0,0 +1,84 @@
+"""
+Entry point of the `nexus-events` console script used by the docker setup.
+
+Loads the package ID, the model owner cap ID and the Sui private key from the
+files the bootstrap containers write to SHARED_DIR and runs the listener in
+this process. The private key is never put on a command line, and docker's
+SIGTERM reaches the listener directly, which drains and checkpoints on it.
+"""
+
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+
+from nexus_events import sui_event
+from nexus_tools.logs import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+def load_package_id(shared_dir: Path) -> str:
+    package_id_path = shared_dir / "package_id.json"
+    try:
+        with open(package_id_path, "r") as f:
+            return json.load(f)[0]
+    except (FileNotFoundError, LookupError, TypeError, json.JSONDecodeError) as e:
+        sys.exit(
+            f"Error: Unable to load package ID from {package_id_path}. Details: {e}"
+        )
+
+
+def load_model_owner_cap_id(shared_dir: Path) -> str:
+    node_details_path = shared_dir / "node_details.json"
+    try:
+        with open(node_details_path, "r") as f:
+            model_owner_cap_id = json.load(f).get("llama_owner_cap_id")
+    except (FileNotFoundError, AttributeError, json.JSONDecodeError) as e:
+        sys.exit(
+            f"Error: Unable to load node details from {node_details_path}. Details: {e}"
+        )
+
+    if not model_owner_cap_id:
+        sys.exit("Error: Model owner capability ID is missing.")
+    return model_owner_cap_id
+
+
+def load_private_key(shared_dir: Path) -> str:
+    keystore_path = shared_dir / "sui.keystore"
+    try:
+        with open(keystore_path, "r") as f:
+            keys = json.load(f)
+        if not keys:
+            raise ValueError(
+                "Sui keystore file is empty. Please check your Sui configuration."
+            )
+        return keys[0]  # Assuming the first key is used
+    except (FileNotFoundError, LookupError, json.JSONDecodeError, ValueError) as e:
+        sys.exit(
+            f"Error: Unable to load SUI private key from {keystore_path}. Details: {e}"
+        )
+
+
+def main():
+    shared_dir = Path(os.getenv("SHARED_DIR", "."))
+
+    # Flags that are not set from the shared files keep their usual defaults
+    args = sui_event.build_parser().parse_args([])
+    args.packageid = load_package_id(shared_dir)
+    args.modelownercapid = load_model_owner_cap_id(shared_dir)
+    args.privkey = load_private_key(shared_dir)
+    args.rpc = os.getenv("RPC_URL", args.rpc)
+    args.ws = os.getenv("WS_URL", args.ws)
+    args.toolurl = os.getenv("TOOL_URL", args.toolurl)
+    # Keep the cursor and journal next to the other state of the node
+    args.statedir = args.statedir or str(shared_dir)
+
+    setup_logging("events")
+    logger.info("Listening for events of package %s on %s", args.packageid, args.rpc)
+    sui_event.run(args)
+
+
+if __name__ == "__main__":
+    main()
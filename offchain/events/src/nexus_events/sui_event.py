@@ -1,7 +1,7 @@
 import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from pysui import SuiConfig
 from pysui.sui.sui_clients.sync_client import SuiClient
-import aiohttp
 import ast
 import argparse
 import time
@@ -14,60 +14,113 @@ import signal
 
 root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.insert(0, root_dir)
-from nexus_tools.server.tools.tools import TOOLS, TOOL_ARGS_MAPPING
+from nexus_tools.logs import Payload, setup_logging
+from nexus_tools.server.tools.manifest import bind_args, load_manifest
 from pysui.sui.sui_clients.sync_client import SuiClient as SyncClient
 from pysui.sui.sui_txn import SyncTransaction
 from pysui.sui.sui_types.scalars import ObjectID, SuiString, SuiBoolean
 from pysui.sui.sui_txresults.complex_tx import SubscribedEvent
-from nexus_events.offchain import OffChain
-import json
+from nexus_events.offchain import InferenceUnavailable, OffChain
+from nexus_sdk.gas import arguments_size, gas_estimator
+from nexus_events.checkpoint import Checkpoint
+from nexus_events.object_cache import ObjectRefCache
+from nexus_events.retry import PendingCompletion, RetryQueue
+from nexus_events.shutdown import GracefulShutdown, GracePeriodExpired
+from nexus_events.transport import close_clients, http_client
 import unicodedata
 import unidecode
 import re
-import traceback
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Separates the context from the task in the prompts built by cluster.move
+TASK_SEPARATOR = "\n\nTask: "
 
 # possible values TALUS_NODE, EXTERNAL_NODE
 node_type = os.environ.get("NODE_TYPE", "TALUS_NODE")
 
 off_chain = OffChain()
 
+# Names and args of the available tools.
+# Loaded from a static manifest so that the listener never imports the tool
+# implementations and their dependencies unless it runs them itself.
+tool_manifest = load_manifest()
+
+# When set, tools run in this pool instead of being called over HTTP.
+# See [create_tool_executor].
+tool_executor = None
+
+# Versions of the objects used by completion transactions, kept current from
+# the effects of the transactions we execute.
+object_refs = ObjectRefCache()
+
+# Completions whose submission failed with a transient error.
+# They are resubmitted between event pages, see [process_retry_queue].
+retry_queue = RetryQueue()
+
 
 async def call_use_tool(name, args, url):
-    """calls /tool/use endpoint with tool name and args, called by event handler"""
-    print(f"Calling /tool/use with name: {name}, args: {args}, url: {url}")
+    """calls /tool/use endpoint with tool name and args, called by event handler
+
+    If the listener runs next to the tools, [tool_executor] is set and the tool
+    is called directly, skipping the HTTP request and the JSON round trip.
+    """
+    logger.debug(
+        "Calling /tool/use with name: %s, args: %s, url: %s", name, Payload(args), url
+    )
 
     try:
-        if name not in TOOLS:
-            print(f"Tool '{name}' not found in TOOLS dictionary")
-            print(f"Available tools: {list(TOOLS.keys())}")
+        if name not in tool_manifest["tools"]:
+            logger.error(
+                "Tool '%s' not found in tool manifest, available tools: %s",
+                name,
+                list(tool_manifest["tools"].keys()),
+            )
             return None
 
-        ToolArgsClass = TOOL_ARGS_MAPPING.get(name, None)
-        if ToolArgsClass is None:
-            print(f"No ToolArgs class found for tool: {name}")
-            return None
+        tool_args = bind_args(tool_manifest, name, args)
 
-        tool_args = ToolArgsClass(**dict(zip(ToolArgsClass.__fields__.keys(), args)))
+        if tool_executor is not None:
+            from nexus_tools.server.tools.tools import run_tool
 
-        payload = {"tool_name": name, "args": tool_args.dict()}
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                tool_executor, run_tool, name, tool_args
+            )
+            return {"result": result}
+
+        payload = {"tool_name": name, "args": tool_args}
 
         headers = {"Content-Type": "application/json"}
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload, headers=headers) as response:
-                if response.status == 400 or response.status == 422:
-                    error_detail = await response.text()
-                    print(f"Error {response.status}: {error_detail}")
-                    return None
-                response.raise_for_status()
-                result = await response.json()
-                return result
+        client, url = http_client(url)
+        response = await asyncio.to_thread(
+            client.post, url, json=payload, headers=headers
+        )
+        if response.status_code == 400 or response.status_code == 422:
+            logger.error("Error %d: %s", response.status_code, Payload(response.text))
+            return None
+        response.raise_for_status()
+        return response.json()
 
     except Exception as e:
-        print(f"Error in call_use_tool: {e}")
+        logger.error("Error in call_use_tool: %s", e)
         return None
 
 
+def create_tool_executor(mode: str, workers: int) -> Executor:
+    """Returns the pool to run tools in for the given --toolmode.
+
+    "http" returns None, tools are then called through --toolurl.
+    """
+    if mode == "thread":
+        return ThreadPoolExecutor(max_workers=workers)
+    if mode == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    return None
+
+
 def sanitize_text(text):
     text = unidecode.unidecode(text)
     text = unicodedata.normalize("NFKD", text)
@@ -79,6 +132,21 @@ def sanitize_text(text):
     return text
 
 
+def with_tool_context(prompt: str, tool_name: str, tool_result) -> str:
+    """Adds the result of the task's tool to its prompt.
+
+    Cluster prompts are the memory context followed by the task. The tool
+    result goes right before the task rather than at the start, so that the
+    prompts of a cluster execution keep their common beginning and Ollama can
+    reuse its evaluation.
+    """
+    tool_context = "context from" + tool_name + ": " + str(tool_result) + ". "
+    head, separator, task = prompt.rpartition(TASK_SEPARATOR)
+    if not separator:
+        return tool_context + prompt
+    return head + separator + tool_context + task
+
+
 async def prompt_event_handler(
     client: SuiClient,
     package_id: str,
@@ -86,7 +154,11 @@ async def prompt_event_handler(
     event: SubscribedEvent,
     tool_url: str,
 ) -> Any:
-    """Handler captures the move event type for each received."""
+    """Handler captures the move event type for each received.
+
+    Runs the tool and inference for the event and returns the completion to
+    submit, or None if there is nothing to submit.
+    """
     try:
         parsed_json = ast.literal_eval(event.parsed_json)
 
@@ -98,77 +170,129 @@ async def prompt_event_handler(
 
         completion = ""
         if temperature < 0.0 or temperature > 2.0:
-            print(
-                f"Invalid temperature value {temperature}. Setting to default value of 1.0"
+            logger.warning(
+                "Invalid temperature value %s. Setting to default value of 1.0",
+                temperature,
             )
             temperature = 1
 
         if parsed_json["tool"]:
             tool_name = parsed_json["tool"]["fields"]["name"]
             tool_args = parsed_json["tool"]["fields"]["args"]
-            print(f"Calling tool '{tool_name}' with args: {tool_args}")
+            logger.info(
+                "Calling tool '%s' with args: %s", tool_name, Payload(tool_args)
+            )
 
             tool_result = await call_use_tool(tool_name, tool_args, tool_url)
             tool_result = tool_result["result"]
-            print(f"tool_result: {tool_result}")
+            logger.debug(
+                "tool_result: %s", Payload(tool_result), extra={"sample": "tool_result"}
+            )
 
             if tool_result:
-                prompt = (
-                    "context from" + tool_name + ": " + str(tool_result) + ". " + prompt
-                )
+                prompt = with_tool_context(prompt, tool_name, tool_result)
             else:
-                print(f"Error calling tool: {tool_name}")
+                logger.error("Error calling tool: %s", tool_name)
                 return None
 
     except Exception as e:
-        print(f"Error extracting prompt info: {e}")
+        logger.error("Error extracting prompt info: %s", e)
 
-    print("Waiting for completion...")
-    completion = off_chain.process(prompt, model_name, max_tokens, temperature)
+    logger.debug("Waiting for completion...")
+    # Prompts of the same cluster execution share their memory context
+    completion = off_chain.process(
+        prompt, model_name, max_tokens, temperature, prefix_key=cluster_execution_id
+    )
 
     try:
-        # Create the configuration
+        completion_safe = sanitize_text(completion)
+    except Exception as e:
+        logger.exception("Error in create_completion: %s", e)
+        return None
+
+    return PendingCompletion(cluster_execution_id, completion_safe)
+
+
+def submit_completion(
+    client: SuiClient,
+    package_id: str,
+    model_owner_cap_id: str,
+    pending: PendingCompletion,
+):
+    """Builds and executes the completion transaction.
+
+    Returns None on success, otherwise the error message. Object inputs come
+    from [object_refs] so that no RPC lookups are needed to build the
+    transaction. Gas coins are selected anew on every call.
+    """
+    target = f"{package_id}::cluster::submit_completion_as_model_owner"
+    try:
         txn = SyncTransaction(client=client)
+        logger.debug("Submitting completion ...")
+        txn.move_call(
+            target=target,
+            arguments=[
+                object_refs.argument(client, pending.cluster_execution_id),
+                object_refs.argument(client, model_owner_cap_id),
+                SuiString(pending.completion),
+            ],
+        )
+        result = gas_estimator.execute(
+            txn, target, arguments_size([pending.completion])
+        )
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+    if result.is_err():
+        return result.result_string
+
+    effects = result.result_data.effects
+    object_refs.update_from_effects(effects)
+    if effects.status.status != "success":
+        return effects.status.error or effects.status.status
+
+    logger.info("Completion created in tx '%s'", effects.transaction_digest)
+    return None
 
-        completion_json = json.loads(completion)
-        completion = completion_json["message"]["content"]
-        completion_safe = sanitize_text(completion)
 
+def submit_or_retry(
+    client: SuiClient,
+    package_id: str,
+    model_owner_cap_id: str,
+    pending: PendingCompletion,
+) -> bool:
+    """Submits the completion and queues it for a retry on a transient failure."""
+    try:
+        error = submit_completion(client, package_id, model_owner_cap_id, pending)
+    except GracePeriodExpired:
+        # Keep the completion so that it is journaled instead of inferred again
+        retry_queue.defer(pending)
+        raise
+    if error is None:
+        return True
+
+    logger.warning("Completion creation transaction failed: %s", error)
+    # The failure may well be caused by a stale version, refetch on retry
+    object_refs.invalidate(pending.cluster_execution_id, model_owner_cap_id)
+    retry_queue.push(pending, error)
+    return False
+
+
+def process_retry_queue(client: SuiClient, package_id: str, model_owner_cap_id: str):
+    """Resubmits all queued completions whose backoff has elapsed."""
+    due = retry_queue.pop_due()
+    for i, pending in enumerate(due):
         try:
-            print("Submitting completion ...")
-            result = txn.move_call(
-                target=f"{package_id}::cluster::submit_completion_as_model_owner",
-                arguments=[
-                    ObjectID(cluster_execution_id),
-                    ObjectID(model_owner_cap_id),
-                    SuiString(completion_safe),
-                ],
-            )
-        except ValueError as e:
-            print(f"Error: {e}")
-            return None
-        except Exception as e:
-            print(f"Error in create_completion: {e}")
-            traceback.print_exc()
-            return
-
-        result = txn.execute(gas_budget=1000000000)
-        if result.is_ok():
-            print(
-                f"Completion created in tx '{result.result_data.effects.transaction_digest}'"
-            )
-            return {"func": result.result_data}
-        else:
-            print(f"Completion creation transaction failed: {result.result_string}")
-            return None
-    except Exception as e:
-        print(f"Error in create_completion: {e}")
-        print(f"Error type: {type(e)}")
-        print(f"Traceback: {traceback.format_exc()}")
-        return None
+            submit_or_retry(client, package_id, model_owner_cap_id, pending)
+        except BaseException:
+            # Requeue the completions not attempted yet so that they are
+            # journaled, the one in flight was requeued by submit_or_retry
+            for rest in due[i + 1 :]:
+                retry_queue.defer(rest)
+            raise
 
 
-def main():
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Listen for ToolUsed events on the Sui network"
     )
@@ -192,11 +316,47 @@ def main():
     parser.add_argument(
         "--toolurl",
         default="http://0.0.0.0:8080/tool/use",
-        help="URL to call /tool/use endpoint",
+        help="URL to call /tool/use endpoint, unix://<socket>:/tool/use for a Unix socket",
+    )
+    parser.add_argument(
+        "--toolmode",
+        choices=["http", "thread", "process"],
+        default=os.getenv("TOOL_MODE", "http"),
+        help="Call tools over HTTP or run them in a local thread or process pool",
+    )
+    parser.add_argument(
+        "--toolworkers",
+        type=int,
+        default=4,
+        help="Number of workers of the local tool pool",
     )
+    parser.add_argument(
+        "--statedir",
+        default=os.getenv("LISTENER_STATE_DIR"),
+        help="Directory to keep the event cursor and the journal of unsubmitted completions in",
+    )
+    parser.add_argument(
+        "--graceperiod",
+        type=float,
+        default=30,
+        help="Seconds to finish in-flight work after SIGTERM/SIGINT before journaling it",
+    )
+    parser.add_argument(
+        "--maxattempts",
+        type=int,
+        default=5,
+        help="Maximum number of attempts to submit a completion",
+    )
+    return parser
+
 
-    args = parser.parse_args()
+def main():
+    setup_logging("events")
+    run(build_parser().parse_args())
 
+
+def run(args: argparse.Namespace):
+    """Runs the listener until the process is stopped."""
     package_id = args.packageid
     model_owner_cap_id = args.modelownercapid
     tool_url = args.toolurl
@@ -206,67 +366,121 @@ def main():
     )
     client = SuiClient(config)
 
-    next_cursor = None
-    while True:
-        next_cursor = process_next_event_page(
-            client,
-            package_id,
-            model_owner_cap_id,
-            cursor=next_cursor,
-            tool_url=tool_url,
-        )
+    retry_queue.max_attempts = args.maxattempts
 
+    global tool_executor
+    tool_executor = create_tool_executor(args.toolmode, args.toolworkers)
 
-# Fetches the next page of events
+    checkpoint = Checkpoint(args.statedir)
+    for pending in checkpoint.load():
+        retry_queue.defer(pending)
+    if checkpoint.cursor is not None:
+        logger.info("Resuming after event %s", checkpoint.cursor.map)
+
+    shutdown = GracefulShutdown(args.graceperiod)
+    shutdown.install()
+
+    try:
+        # Journaled completions leave the journal once submitted or requeued
+        process_retry_queue(client, package_id, model_owner_cap_id)
+        checkpoint.save_journal(retry_queue.snapshot())
+
+        while not shutdown.requested:
+            process_next_event_page(
+                client,
+                package_id,
+                model_owner_cap_id,
+                checkpoint,
+                tool_url=tool_url,
+                shutdown=shutdown,
+            )
+            process_retry_queue(client, package_id, model_owner_cap_id)
+            checkpoint.save_cursor()
+        logger.info("Drained in-flight work")
+    except GracePeriodExpired:
+        logger.warning("Grace period expired, abandoning in-flight work")
+    finally:
+        # Signals are ignored until the checkpoint is written in full
+        shutdown.cancel()
+        pending = retry_queue.drain()
+        checkpoint.save_cursor()
+        checkpoint.save_journal(pending)
+        logger.info("Checkpoint saved, %d completions journaled", len(pending))
+        shutdown.restore()
+        if tool_executor is not None:
+            tool_executor.shutdown(wait=False, cancel_futures=True)
+        close_clients()
+
+
+# Fetches and handles the next page of events after [Checkpoint.cursor].
 #
-# Returns a tuple:
-# - The first element is the next cursor to use
-# - The second element is a boolean indicating whether the first event should be skipped
+# The cursor is advanced after every handled event so that a shutdown halfway
+# through the page resumes at the first event that was not handled.
+# Returns the new cursor.
 def process_next_event_page(
     client: SuiClient,
     package_id: str,
     model_owner_cap_id: str,
-    cursor: EventID,
+    checkpoint: Checkpoint,
     tool_url: str,
+    shutdown: GracefulShutdown = None,
 ):
     prompt_event_type = f"{package_id}::prompt::RequestForCompletionEvent"
     event_filter = MoveEventTypeQuery(prompt_event_type)
 
     events_result = client.get_events(
-        query=event_filter, descending_order=SuiBoolean(False), cursor=cursor
+        query=event_filter,
+        descending_order=SuiBoolean(False),
+        cursor=checkpoint.cursor,
     )
     if events_result.is_err():
-        print(f"Cannot read Sui events: {events_result.result_string}")
+        logger.error("Cannot read Sui events: %s", events_result.result_string)
         sys.exit(1)
 
     events = events_result.result_data.data
     # If you needed to debug the events, print some information with this:
     for event in events:
-        print(f"event_id: {event.event_id}, timestamp_ms: {event.timestamp_ms}")
+        logger.debug(
+            "event_id: %s, timestamp_ms: %s",
+            event.event_id,
+            event.timestamp_ms,
+            extra={"sample": "event"},
+        )
 
     if not events:
-        print(f"No new events, waiting...")
+        logger.debug("No new events, waiting...")
         time.sleep(3)
-        return cursor
+        return checkpoint.cursor
 
-    print(f"Processing {len(events)} events")
+    logger.info("Processing %d events", len(events))
     for event in events:
-        asyncio.run(
-            prompt_event_handler(
-                client, package_id, model_owner_cap_id, event, tool_url
+        if shutdown is not None and shutdown.requested:
+            logger.info("Shutting down, remaining events are left for the next start")
+            break
+
+        try:
+            pending = asyncio.run(
+                prompt_event_handler(
+                    client, package_id, model_owner_cap_id, event, tool_url
+                )
             )
+        except InferenceUnavailable as e:
+            # The cursor stays before this event, so it is handled again with
+            # the next page once the tools server has caught up
+            logger.warning("%s, pausing for %.1fs", e, e.retry_after_s)
+            time.sleep(e.retry_after_s)
+            break
+
+        # Once the completion exists the event is handled: from here on the
+        # completion is either onchain, in the retry queue or in the journal.
+        # We don't use the "next_cursor" property to simplify the code.
+        checkpoint.cursor = EventID(
+            event.event_id["eventSeq"], event.event_id["txDigest"]
         )
+        if pending is not None:
+            submit_or_retry(client, package_id, model_owner_cap_id, pending)
 
-    # Set the cursor to the last event.
-    # Also next fetch will skip the first event (the last event of this fetch)
-    # since it will have been already processed.
-    # We don't use the "next_cursor" property to simplify the code.
-
-    last_event_id = events[-1].event_id
-    event_seq = last_event_id["eventSeq"]
-    tx_digest = last_event_id["txDigest"]
-    next_cursor = EventID(event_seq, tx_digest)
-    return next_cursor
+    return checkpoint.cursor
 
 
 if __name__ == "__main__":
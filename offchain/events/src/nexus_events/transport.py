@@ -0,0 +1,53 @@
+import httpx
+from typing import Dict, Optional, Tuple
+
+UNIX_SCHEME = "unix://"
+
+# Inference can take minutes, only connecting is bounded.
+DEFAULT_TIMEOUT = httpx.Timeout(None, connect=10.0)
+
+DEFAULT_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16)
+
+# One pooled client per endpoint, keyed by socket path (or "tcp").
+_clients: Dict[str, httpx.Client] = {}
+
+
+def split_unix_url(url: str) -> Tuple[Optional[str], str]:
+    """Splits a `unix://` URL into the socket path and the URL to request.
+
+    `unix:///run/nexus/tools.sock:/predict` is the `/predict` route of a
+    server listening on `/run/nexus/tools.sock`. Other URLs are returned
+    unchanged with no socket path.
+    """
+    if not url.startswith(UNIX_SCHEME):
+        return None, url
+
+    socket_path, sep, path = url[len(UNIX_SCHEME) :].rpartition(":")
+    if not sep or not path.startswith("/"):
+        raise ValueError(
+            f"Expected {UNIX_SCHEME}<socket path>:<http path>, got '{url}'"
+        )
+    # The host is only used for the Host header, the socket decides where we connect
+    return socket_path, f"http://localhost{path}"
+
+
+def http_client(url: str) -> Tuple[httpx.Client, str]:
+    """Returns a keep-alive client for the URL and the URL to pass to it.
+
+    Clients are shared per endpoint so that consecutive requests reuse their
+    connections instead of paying a handshake and an ephemeral port each.
+    """
+    socket_path, request_url = split_unix_url(url)
+    key = socket_path or "tcp"
+    client = _clients.get(key)
+    if client is None:
+        transport = httpx.HTTPTransport(uds=socket_path, limits=DEFAULT_LIMITS)
+        client = httpx.Client(transport=transport, timeout=DEFAULT_TIMEOUT)
+        _clients[key] = client
+    return client, request_url
+
+
+def close_clients():
+    for client in _clients.values():
+        client.close()
+    _clients.clear()
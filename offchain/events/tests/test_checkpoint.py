@@ -0,0 +1,111 @@
+"""
+tests for resuming after a restart in checkpoint.py and shutdown.py
+To run, execute "PYTHONPATH=src:../tools/src:../../nexus_sdk/src pytest tests/test_checkpoint.py"
+from `events` directory
+"""
+
+import os
+import signal
+
+import pytest
+from pysui.sui.sui_types.collections import EventID
+
+from nexus_events import sui_event
+from nexus_events.checkpoint import JOURNAL_FILE, Checkpoint
+from nexus_events.retry import PendingCompletion, RetryQueue
+from nexus_events.shutdown import GracefulShutdown, GracePeriodExpired
+
+
+def test_cursor_survives_restart(tmp_path):
+    checkpoint = Checkpoint(tmp_path)
+    checkpoint.cursor = EventID("7", "digest")
+    checkpoint.save_cursor()
+
+    restarted = Checkpoint(tmp_path)
+    assert restarted.load() == []
+    assert restarted.cursor.map == {"eventSeq": "7", "txDigest": "digest"}
+
+
+def test_journal_is_kept_until_replayed(tmp_path):
+    checkpoint = Checkpoint(tmp_path)
+    checkpoint.save_journal(
+        [PendingCompletion("0x1", "first", attempts=2), PendingCompletion("0x2", "b")]
+    )
+
+    replayed = Checkpoint(tmp_path).load()
+    assert [(p.cluster_execution_id, p.completion, p.attempts) for p in replayed] == [
+        ("0x1", "first", 2),
+        ("0x2", "b", 0),
+    ]
+    # A crash before the replay finished replays the journal again
+    assert len(Checkpoint(tmp_path).load()) == 2
+
+    checkpoint.save_journal(replayed[1:])
+    assert [p.completion for p in Checkpoint(tmp_path).load()] == ["b"]
+    checkpoint.save_journal([])
+    assert not (tmp_path / JOURNAL_FILE).exists()
+    assert Checkpoint(tmp_path).load() == []
+
+
+def test_without_state_dir_nothing_is_persisted():
+    checkpoint = Checkpoint()
+    checkpoint.cursor = EventID("7", "digest")
+    checkpoint.save_cursor()
+    checkpoint.save_journal([PendingCompletion("0x1", "a")])
+    assert checkpoint.load() == []
+
+
+def test_grace_period_expiry_defers_the_completion(monkeypatch):
+    queue = RetryQueue()
+    monkeypatch.setattr(sui_event, "retry_queue", queue)
+
+    def expire(*args):
+        raise GracePeriodExpired()
+
+    monkeypatch.setattr(sui_event, "submit_completion", expire)
+    pending = PendingCompletion("0x1", "completion")
+    with pytest.raises(GracePeriodExpired):
+        sui_event.submit_or_retry(None, "0xpackage", "0xcap", pending)
+
+    assert queue.drain() == [pending]
+    assert pending.attempts == 0
+
+
+def test_grace_period_expiry_during_replay_keeps_the_journal(monkeypatch, tmp_path):
+    queue = RetryQueue()
+    monkeypatch.setattr(sui_event, "retry_queue", queue)
+    Checkpoint(tmp_path).save_journal(
+        [PendingCompletion(f"0x{i}", f"completion {i}") for i in range(4)]
+    )
+
+    submitted = []
+
+    def submit(client, package_id, model_owner_cap_id, pending):
+        if len(submitted) == 2:
+            raise GracePeriodExpired()
+        submitted.append(pending.cluster_execution_id)
+
+    monkeypatch.setattr(sui_event, "submit_completion", submit)
+    checkpoint = Checkpoint(tmp_path)
+    for pending in checkpoint.load():
+        queue.defer(pending)
+    with pytest.raises(GracePeriodExpired):
+        sui_event.process_retry_queue(None, "0xpackage", "0xcap")
+    checkpoint.save_journal(queue.drain())
+
+    assert submitted == ["0x0", "0x1"]
+    journaled = Checkpoint(tmp_path).load()
+    assert sorted(p.cluster_execution_id for p in journaled) == ["0x2", "0x3"]
+
+
+def test_signals_are_ignored_while_checkpointing():
+    previous = signal.getsignal(signal.SIGTERM)
+    shutdown = GracefulShutdown(grace_period_s=30)
+    shutdown.install()
+    shutdown.cancel()
+    try:
+        os.kill(os.getpid(), signal.SIGTERM)
+        assert not shutdown.requested
+    finally:
+        shutdown.restore()
+    assert signal.getsignal(signal.SIGTERM) == previous
@@ -0,0 +1,103 @@
+"""
+tests for the object reference cache in object_cache.py
+To run, execute "PYTHONPATH=src pytest tests/test_object_cache.py" from `events` directory
+"""
+
+from types import SimpleNamespace
+
+from pysui.sui.sui_txresults.single_tx import SharedOwner
+
+from nexus_events.object_cache import ObjectRefCache
+
+OWNED = "0x" + "1" * 64
+SHARED = "0x" + "2" * 64
+OTHER = "0x" + "3" * 64
+
+
+class FakeClient:
+    def __init__(self):
+        self.versions = {OWNED: 3, SHARED: 8, OTHER: 1}
+        self.fetches = []
+
+    def get_object(self, object_id):
+        object_id = str(object_id)
+        self.fetches.append(object_id)
+        owner = (
+            SharedOwner("Shared", "5")
+            if object_id == SHARED
+            else SimpleNamespace(owner_type="AddressOwner")
+        )
+        return SimpleNamespace(
+            is_err=lambda: False,
+            result_data=SimpleNamespace(
+                object_id=object_id,
+                version=str(self.versions[object_id]),
+                digest=f"digest-{self.versions[object_id]}",
+                owner=owner,
+            ),
+        )
+
+
+def ref(object_id, version):
+    return SimpleNamespace(object_id=object_id, version=version, digest=f"d{version}")
+
+
+def effects(mutated=(), deleted=(), wrapped=()):
+    return SimpleNamespace(
+        mutated=[SimpleNamespace(reference=r) for r in mutated],
+        deleted=list(deleted),
+        wrapped=list(wrapped),
+    )
+
+
+def test_objects_are_fetched_once():
+    client, cache = FakeClient(), ObjectRefCache()
+    cache.get(client, OWNED)
+    cache.get(client, OWNED)
+    assert client.fetches == [OWNED]
+    assert cache.get(client, SHARED).initial_shared_version == 5
+
+
+def test_effects_move_owned_objects_to_their_new_version():
+    client, cache = FakeClient(), ObjectRefCache()
+    cache.get(client, OWNED)
+    cache.get(client, SHARED)
+
+    cache.update_from_effects(effects(mutated=[ref(OWNED, 4), ref(SHARED, 9)]))
+    owned = cache.get(client, OWNED)
+    assert (owned.version, owned.digest) == (4, "d4")
+    # Shared inputs are keyed by their initial version and never go stale
+    assert cache.get(client, SHARED).version == 8
+    assert client.fetches == [OWNED, SHARED]
+
+
+def test_deleted_and_wrapped_objects_are_forgotten():
+    client, cache = FakeClient(), ObjectRefCache()
+    cache.get(client, OWNED)
+    cache.get(client, SHARED)
+    cache.update_from_effects(
+        effects(deleted=[ref(OWNED, 4)], wrapped=[ref(SHARED, 9)])
+    )
+    assert len(cache) == 0
+
+
+def test_invalidated_objects_are_fetched_again():
+    client, cache = FakeClient(), ObjectRefCache()
+    cache.get(client, OWNED)
+    # A failed transaction may have left the cached version stale
+    client.versions[OWNED] = 6
+    cache.invalidate(OWNED, SHARED)
+    assert cache.get(client, OWNED).version == 6
+    assert client.fetches == [OWNED, OWNED]
+
+
+def test_least_recently_used_object_is_evicted():
+    client, cache = FakeClient(), ObjectRefCache(max_entries=2)
+    cache.get(client, OWNED)
+    cache.get(client, SHARED)
+    cache.get(client, OWNED)
+    cache.get(client, OTHER)
+    assert len(cache) == 2
+    cache.get(client, OWNED)
+    cache.get(client, SHARED)
+    assert client.fetches == [OWNED, SHARED, OTHER, SHARED]
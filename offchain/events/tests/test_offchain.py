@@ -0,0 +1,61 @@
+"""
+tests for calling the tools server in offchain.py
+To run, execute "PYTHONPATH=src pytest tests/test_offchain.py" from `events` directory
+"""
+
+import httpx
+import pytest
+
+from nexus_events import offchain
+from nexus_events.offchain import InferenceError, InferenceUnavailable, OffChain
+
+
+def serve(monkeypatch, responses):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return responses.pop(0)
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(offchain, "http_client", lambda url: (client, url))
+    return requests
+
+
+def overloaded(retry_after="2"):
+    return httpx.Response(503, headers={"Retry-After": retry_after}, text="busy")
+
+
+def test_retries_after_the_server_asks_to(monkeypatch):
+    sleeps = []
+    off_chain = OffChain(max_attempts=3, sleep=sleeps.append)
+    requests = serve(
+        monkeypatch,
+        [
+            overloaded(),
+            overloaded("120"),
+            httpx.Response(200, json={"completion": "hi"}),
+        ],
+    )
+    assert off_chain.process("prompt", "llama3", 10, 0.0) == "hi"
+    assert len(requests) == 3
+    assert sleeps == [2.0, offchain.LLM_ASSISTANT_MAX_RETRY_AFTER_S]
+
+
+def test_gives_up_with_a_retryable_error(monkeypatch):
+    sleeps = []
+    off_chain = OffChain(max_attempts=2, sleep=sleeps.append)
+    serve(monkeypatch, [overloaded(), overloaded("5")])
+    with pytest.raises(InferenceUnavailable) as error:
+        off_chain.process("prompt", "llama3", 10, 0.0)
+    assert error.value.retry_after_s == 5.0
+    assert sleeps == [2.0]
+
+
+def test_other_errors_are_not_retried(monkeypatch):
+    off_chain = OffChain(max_attempts=3, sleep=lambda _: None)
+    requests = serve(monkeypatch, [httpx.Response(500, text="boom")])
+    with pytest.raises(InferenceError) as error:
+        off_chain.process("prompt", "llama3", 10, 0.0)
+    assert not isinstance(error.value, InferenceUnavailable)
+    assert len(requests) == 1
@@ -0,0 +1,71 @@
+"""
+tests for retrying completion submissions in retry.py
+To run, execute "PYTHONPATH=src pytest tests/test_retry.py" from `events` directory
+"""
+
+import pytest
+
+from nexus_events.retry import PendingCompletion, RetryQueue, is_retryable_error
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        "ObjectLockConflict { obj_ref: (0x1, SequenceNumber(3), o#abc) }",
+        "TransactionExpired",
+        "ObjectVersionUnavailableForConsumption { provided_obj_ref: ... }",
+        "Request timed out",
+        "InsufficientCoinBalance",
+    ],
+)
+def test_contention_and_flaky_node_errors_are_retryable(error):
+    assert is_retryable_error(error)
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        "MoveAbort(MoveLocation { module: cluster }, 3) in command 0",
+        # Permanent markers win over retryable ones
+        "MoveAbort after gas smashing",
+        "something nobody has seen before",
+    ],
+)
+def test_other_errors_are_permanent(error):
+    assert not is_retryable_error(error)
+
+
+def test_backoff_grows_exponentially_within_bounds():
+    queue = RetryQueue(base_delay_s=1.0, max_delay_s=8.0)
+    for attempts, delay in [(0, 1), (1, 1), (2, 2), (3, 4), (4, 8), (10, 8)]:
+        for _ in range(20):
+            assert delay / 2 <= queue.backoff(attempts) <= delay
+
+
+def test_push_schedules_until_attempts_run_out():
+    queue = RetryQueue(max_attempts=3)
+    item = PendingCompletion("0x1", "completion")
+
+    assert queue.push(item, "ObjectLockConflict")
+    assert queue.push(queue.drain()[0], "TransactionExpired")
+    assert not queue.push(queue.drain()[0], "ObjectLockConflict")
+    assert item.attempts == 3
+    assert len(queue) == 0
+
+
+def test_push_drops_permanent_errors_right_away():
+    queue = RetryQueue()
+    item = PendingCompletion("0x1", "completion")
+    assert not queue.push(item, "MoveAbort in command 0")
+    assert len(queue) == 0
+
+
+def test_pop_due_only_returns_elapsed_backoffs():
+    queue = RetryQueue(base_delay_s=10.0)
+    queue.push(PendingCompletion("0x1", "later"), "timeout")
+    queue.defer(PendingCompletion("0x2", "now"))
+
+    due = queue.pop_due()
+    assert [item.completion for item in due] == ["now"]
+    assert len(queue) == 1
+    assert [item.completion for item in queue.pop_due(now=float("inf"))] == ["later"]
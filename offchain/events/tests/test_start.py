@@ -0,0 +1,77 @@
+"""
+tests for loading the node's shared files in start.py
+To run, execute "PYTHONPATH=src:../tools/src:../../nexus_sdk/src pytest tests/test_start.py"
+from `events` directory
+"""
+
+import json
+
+import pytest
+
+from nexus_events import start
+
+
+def write_shared_files(shared_dir):
+    (shared_dir / "package_id.json").write_text(json.dumps(["0xpackage"]))
+    (shared_dir / "node_details.json").write_text(
+        json.dumps({"llama_owner_cap_id": "0xcap"})
+    )
+    (shared_dir / "sui.keystore").write_text(json.dumps(["key-1", "key-2"]))
+
+
+def test_loads_the_shared_files(tmp_path):
+    write_shared_files(tmp_path)
+    assert start.load_package_id(tmp_path) == "0xpackage"
+    assert start.load_model_owner_cap_id(tmp_path) == "0xcap"
+    assert start.load_private_key(tmp_path) == "key-1"
+
+
+@pytest.mark.parametrize(
+    "loader",
+    [start.load_package_id, start.load_model_owner_cap_id, start.load_private_key],
+)
+def test_missing_files_exit(tmp_path, loader):
+    with pytest.raises(SystemExit, match="Unable to load"):
+        loader(tmp_path)
+
+
+@pytest.mark.parametrize(
+    "file_name, content, loader",
+    [
+        ("package_id.json", "not json", start.load_package_id),
+        ("package_id.json", "[]", start.load_package_id),
+        ("package_id.json", "{}", start.load_package_id),
+        ("node_details.json", "{", start.load_model_owner_cap_id),
+        ("node_details.json", "[]", start.load_model_owner_cap_id),
+        ("node_details.json", "{}", start.load_model_owner_cap_id),
+        ("sui.keystore", "", start.load_private_key),
+        ("sui.keystore", "[]", start.load_private_key),
+        ("sui.keystore", "{}", start.load_private_key),
+    ],
+)
+def test_malformed_files_exit(tmp_path, file_name, content, loader):
+    write_shared_files(tmp_path)
+    (tmp_path / file_name).write_text(content)
+    with pytest.raises(SystemExit):
+        loader(tmp_path)
+
+
+def test_main_runs_the_listener_with_the_shared_files(tmp_path, monkeypatch):
+    write_shared_files(tmp_path)
+    monkeypatch.setenv("SHARED_DIR", str(tmp_path))
+    monkeypatch.setenv("RPC_URL", "http://sui:9000")
+    monkeypatch.delenv("WS_URL", raising=False)
+    monkeypatch.delenv("LISTENER_STATE_DIR", raising=False)
+    monkeypatch.setattr(start, "setup_logging", lambda name: None)
+    runs = []
+    monkeypatch.setattr(start.sui_event, "run", runs.append)
+
+    start.main()
+
+    (args,) = runs
+    assert args.packageid == "0xpackage"
+    assert args.modelownercapid == "0xcap"
+    assert args.privkey == "key-1"
+    assert args.rpc == "http://sui:9000"
+    assert args.ws == "ws://localhost:9000"
+    assert args.statedir == str(tmp_path)
@@ -0,0 +1,83 @@
+"""
+tests for the pooled HTTP clients in transport.py
+To run, execute "PYTHONPATH=src pytest tests/test_transport.py" from `events` directory
+"""
+
+import http.server
+import socketserver
+import threading
+
+import pytest
+
+from nexus_events import transport
+from nexus_events.transport import close_clients, http_client, split_unix_url
+
+
+@pytest.fixture(autouse=True)
+def fresh_clients():
+    close_clients()
+    yield
+    close_clients()
+
+
+def test_split_unix_url():
+    assert split_unix_url("unix:///run/nexus/tools.sock:/predict") == (
+        "/run/nexus/tools.sock",
+        "http://localhost/predict",
+    )
+    assert split_unix_url("unix:///tmp/a:b.sock:/tool/use?x=1") == (
+        "/tmp/a:b.sock",
+        "http://localhost/tool/use?x=1",
+    )
+
+
+def test_split_unix_url_without_path():
+    with pytest.raises(ValueError):
+        split_unix_url("unix:///run/nexus/tools.sock")
+    with pytest.raises(ValueError):
+        split_unix_url("unix:///run/nexus/tools.sock:predict")
+
+
+def test_split_leaves_http_urls_alone():
+    assert split_unix_url("http://0.0.0.0:8080/tool/use") == (
+        None,
+        "http://0.0.0.0:8080/tool/use",
+    )
+
+
+def test_clients_are_reused_per_endpoint():
+    tcp, url = http_client("http://localhost:8080/predict")
+    assert url == "http://localhost:8080/predict"
+    assert http_client("http://other:8080/tool/use")[0] is tcp
+
+    uds, _ = http_client("unix:///run/a.sock:/predict")
+    assert uds is not tcp
+    assert http_client("unix:///run/a.sock:/tool/use")[0] is uds
+    assert http_client("unix:///run/b.sock:/predict")[0] is not uds
+
+    close_clients()
+    assert transport._clients == {}
+    assert tcp.is_closed
+
+
+def test_requests_reach_a_unix_socket(tmp_path):
+    socket_path = str(tmp_path / "tools.sock")
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = self.path.encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    with socketserver.UnixStreamServer(socket_path, Handler) as server:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        client, url = http_client(f"unix://{socket_path}:/predict")
+        response = client.get(url)
+        server.shutdown()
+
+    assert response.text == "/predict"
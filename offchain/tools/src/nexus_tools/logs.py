@@ -0,0 +1,177 @@
+"""
+Logging setup shared by the tools server and the event listener.
+
+Records are put on a bounded in-memory queue by the calling thread and
+formatted and written by a background thread, so log I/O never blocks the
+event loop or inference. If the queue is full, records are dropped rather
+than waited on.
+
+Configured through environment variables:
+
+- `LOG_LEVEL` (default `INFO`): root level
+- `LOG_LEVELS`: per logger levels, e.g. `nexus_events=DEBUG,httpx=WARNING`
+- `LOG_FORMAT` (default `json`): `json` for one structured record per line, or `text`
+- `LOG_PAYLOAD_MAX_CHARS` (default `256`): how much of a [Payload] is written
+- `LOG_SAMPLE_RATES`: keep only a fraction of the records logged with
+  `extra={"sample": key}`, e.g. `event=0.1,tool_result=0.5`
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+# Attributes every LogRecord has, anything else came in through `extra`
+_RECORD_ATTRS = set(logging.LogRecord("", 0, "", 0, "", None, None).__dict__.keys()) | {
+    "message",
+    "asctime",
+    "taskName",
+}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class Payload:
+    """Wraps a potentially large value that should not be logged in full.
+
+    Nothing is computed when the record is created: truncation and hashing
+    happen when the background thread formats the record, and only if the
+    record passed the level and sampling filters.
+    """
+
+    max_chars = 256
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        text = self.value if isinstance(self.value, str) else str(self.value)
+        if len(text) <= self.max_chars:
+            return text
+        digest = hashlib.sha256(text.encode()).hexdigest()[:12]
+        return f"{text[:self.max_chars]}... [{len(text)} chars, sha256 {digest}]"
+
+    __repr__ = __str__
+
+
+class SamplingFilter(logging.Filter):
+    """Drops a share of the records marked with `extra={"sample": key}`."""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        key = getattr(record, "sample", None)
+        if key is None:
+            return True
+        return random.random() < self.rates.get(key, 1.0)
+
+
+class JsonFormatter(logging.Formatter):
+    def __init__(self, service: str):
+        super().__init__()
+        self.service = service
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "service": self.service,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key != "sample":
+                entry[key] = value if _is_json_scalar(value) else str(value)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records without formatting them and without ever waiting.
+
+    Uses a SimpleQueue, whose put is reentrant and thus safe to call from
+    signal handlers, bounded by dropping records above `max_size`.
+    """
+
+    dropped = 0
+
+    def __init__(self, max_size: int = 10000):
+        super().__init__(queue.SimpleQueue())
+        self.max_size = max_size
+
+    def prepare(self, record):
+        # The default implementation formats the message in the calling
+        # thread. We leave it to the listener thread, the args are either
+        # immutable or [Payload] wrappers around immutable values.
+        return record
+
+    def enqueue(self, record):
+        if self.queue.qsize() >= self.max_size:
+            NonBlockingQueueHandler.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+
+def setup_logging(service: str):
+    """Routes all logging of the process through a background writer thread.
+
+    Calling it again replaces the previous setup.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    Payload.max_chars = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "256"))
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if os.getenv("LOG_FORMAT", "json") == "text":
+        stream_handler.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        )
+    else:
+        stream_handler.setFormatter(JsonFormatter(service))
+
+    queue_handler = NonBlockingQueueHandler()
+    queue_handler.addFilter(SamplingFilter(_parse_pairs("LOG_SAMPLE_RATES", float)))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    for name, level in _parse_pairs("LOG_LEVELS", str.upper).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(
+        queue_handler.queue, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+
+
+@atexit.register
+def _flush_on_exit():
+    if _listener is not None:
+        _listener.stop()
+
+
+def _parse_pairs(env: str, convert) -> dict:
+    pairs = {}
+    for item in os.getenv(env, "").split(","):
+        if "=" in item:
+            key, value = item.split("=", 1)
+            pairs[key.strip()] = convert(value.strip())
+    return pairs
+
+
+def _is_json_scalar(value) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool))
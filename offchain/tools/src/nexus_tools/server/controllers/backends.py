@@ -0,0 +1,364 @@
+"""
+Inference backends the tools server can send requests to.
+
+Every backend speaks in the shapes of Ollama's API: a chat response is a dict
+with `message`, `done`, `done_reason` and the usage counts
+`prompt_eval_count` and `eval_count` plus durations in nanoseconds, streams
+yield chunks of that shape and the last one has `done` set. The rest of the
+server therefore does not care which runtime serves a model.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional
+
+import httpx
+import numpy as np
+from ollama import AsyncClient
+
+
+class BackendError(Exception):
+    """A backend answered with an error status."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class InferenceBackend(ABC):
+    @abstractmethod
+    async def chat(
+        self,
+        model: str,
+        messages: List[dict],
+        options: Optional[dict] = None,
+        keep_alive=None,
+    ) -> dict:
+        """Generates the completion of `messages`."""
+
+    @abstractmethod
+    async def chat_stream(
+        self,
+        model: str,
+        messages: List[dict],
+        options: Optional[dict] = None,
+        keep_alive=None,
+    ) -> AsyncIterator[dict]:
+        """Starts generating and returns the stream of chunks."""
+
+    @abstractmethod
+    async def embed(self, model: str, input: str, keep_alive=None) -> dict:
+        """Returns `{"embeddings": [...]}` with one vector per input."""
+
+    @abstractmethod
+    async def list(self) -> dict:
+        """Returns `{"models": [...]}`, each with at least `model` and `name`."""
+
+    async def ps(self) -> dict:
+        """The models loaded in memory, by default all of them."""
+        return await self.list()
+
+    async def generate(self, model: str, keep_alive=None):
+        """Loads, or with keep_alive 0 unloads, a model. A no-op by default
+        for runtimes that keep their models loaded.
+        """
+
+    async def close(self):
+        pass
+
+
+class OllamaBackend(InferenceBackend):
+    def __init__(self, url: str, **client_kwargs):
+        self.client = AsyncClient(host=url, **client_kwargs)
+
+    async def chat(self, model, messages, options=None, keep_alive=None):
+        return as_dict(
+            await self.client.chat(
+                model=model, messages=messages, options=options, keep_alive=keep_alive
+            )
+        )
+
+    async def chat_stream(self, model, messages, options=None, keep_alive=None):
+        chunks = await self.client.chat(
+            model=model,
+            messages=messages,
+            options=options,
+            keep_alive=keep_alive,
+            stream=True,
+        )
+
+        async def as_dicts():
+            async for chunk in chunks:
+                yield as_dict(chunk)
+
+        return as_dicts()
+
+    async def embed(self, model, input, keep_alive=None):
+        return as_dict(
+            await self.client.embed(model=model, input=input, keep_alive=keep_alive)
+        )
+
+    async def list(self):
+        return _normalized_listing(as_dict(await self.client.list()))
+
+    async def ps(self):
+        return _normalized_listing(as_dict(await self.client.ps()))
+
+    async def generate(self, model, keep_alive=None):
+        await self.client.generate(model=model, keep_alive=keep_alive)
+
+    async def close(self):
+        await self.client.close()
+
+
+class OpenAICompatibleBackend(InferenceBackend):
+    """Any server with OpenAI's chat completions API, e.g. llama.cpp's server
+    or vLLM. Such servers load their models at start, so keep_alive is
+    ignored, and they do not report digests, so their completions are not
+    cached by the exact cache.
+    """
+
+    def __init__(self, url: str, api_key: Optional[str] = None, **client_kwargs):
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.client = httpx.AsyncClient(
+            base_url=url.rstrip("/"), headers=headers, **client_kwargs
+        )
+
+    async def chat(self, model, messages, options=None, keep_alive=None):
+        started = time.perf_counter_ns()
+        response = await self._post(
+            "/v1/chat/completions", self._chat_body(model, messages, options)
+        )
+        body = response.json()
+        choice = body["choices"][0]
+        return self._with_usage(
+            {
+                "model": model,
+                "created_at": _now(),
+                "message": {
+                    "role": "assistant",
+                    "content": choice["message"].get("content") or "",
+                },
+                "done": True,
+                "done_reason": choice.get("finish_reason"),
+                "total_duration": time.perf_counter_ns() - started,
+            },
+            body.get("usage"),
+        )
+
+    async def chat_stream(self, model, messages, options=None, keep_alive=None):
+        body = self._chat_body(model, messages, options)
+        body["stream"] = True
+        body["stream_options"] = {"include_usage": True}
+        request = self.client.build_request("POST", "/v1/chat/completions", json=body)
+        started = time.perf_counter_ns()
+        response = await self.client.send(request, stream=True)
+        if response.status_code >= 400:
+            await response.aread()
+            await response.aclose()
+            raise BackendError(response.text, response.status_code)
+
+        async def chunks():
+            done_reason, usage = None, None
+            try:
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:") :].strip()
+                    if data == "[DONE]":
+                        break
+                    event = json.loads(data)
+                    usage = event.get("usage") or usage
+                    for choice in event.get("choices") or []:
+                        done_reason = choice.get("finish_reason") or done_reason
+                        content = (choice.get("delta") or {}).get("content")
+                        if content:
+                            yield {
+                                "model": model,
+                                "message": {"role": "assistant", "content": content},
+                                "done": False,
+                            }
+            finally:
+                await response.aclose()
+            yield self._with_usage(
+                {
+                    "model": model,
+                    "message": {"role": "assistant", "content": ""},
+                    "done": True,
+                    "done_reason": done_reason,
+                    "total_duration": time.perf_counter_ns() - started,
+                },
+                usage,
+            )
+
+        return chunks()
+
+    async def embed(self, model, input, keep_alive=None):
+        response = await self._post("/v1/embeddings", {"model": model, "input": input})
+        return {"embeddings": [item["embedding"] for item in response.json()["data"]]}
+
+    async def list(self):
+        response = await self.client.get("/v1/models")
+        if response.status_code >= 400:
+            raise BackendError(response.text, response.status_code)
+        return {
+            "models": [
+                {"model": item["id"], "name": item["id"]}
+                for item in response.json().get("data", [])
+            ]
+        }
+
+    async def close(self):
+        await self.client.aclose()
+
+    @staticmethod
+    def _chat_body(model, messages, options) -> dict:
+        options = options or {}
+        body = {"model": model, "messages": messages}
+        if "temperature" in options:
+            body["temperature"] = options["temperature"]
+        if "num_predict" in options:
+            body["max_tokens"] = options["num_predict"]
+        return body
+
+    @staticmethod
+    def _with_usage(response: dict, usage: Optional[dict]) -> dict:
+        if usage:
+            response["prompt_eval_count"] = usage.get("prompt_tokens")
+            response["eval_count"] = usage.get("completion_tokens")
+        return response
+
+    async def _post(self, path: str, body: dict) -> httpx.Response:
+        response = await self.client.post(path, json=body)
+        if response.status_code >= 400:
+            raise BackendError(response.text, response.status_code)
+        return response
+
+
+class StubEmbedder:
+    """Deterministic embedding of the character trigrams of a text.
+
+    Needs no model, texts that only differ in case, whitespace or punctuation
+    embed to the same vector. Meant for tests and benchmarks.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    async def __call__(self, text: str) -> np.ndarray:
+        text = " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for i in range(max(len(text) - 2, 1)):
+            digest = hashlib.blake2b(text[i : i + 3].encode(), digest_size=4).digest()
+            vector[int.from_bytes(digest, "little") % self.dim] += 1.0
+        return vector
+
+
+class StubBackend(InferenceBackend):
+    """Deterministic in-process backend for tests and benchmarks.
+
+    Answers every prompt with a completion derived from its hash, counts a
+    token per four characters and takes `latency_s` (STUB_LATENCY_S) per
+    request, spread over the chunks of a stream.
+    """
+
+    def __init__(self, latency_s: Optional[float] = None):
+        self.latency_s = (
+            float(os.getenv("STUB_LATENCY_S", "0")) if latency_s is None else latency_s
+        )
+        self.embedder = StubEmbedder()
+        self.models = set()
+
+    async def chat(self, model, messages, options=None, keep_alive=None):
+        chunks = await self.chat_stream(model, messages, options, keep_alive)
+        content = ""
+        async for chunk in chunks:
+            content += chunk["message"]["content"]
+        chunk["message"]["content"] = content
+        return chunk
+
+    async def chat_stream(self, model, messages, options=None, keep_alive=None):
+        self.models.add(model)
+        prompt = "".join(message["content"] for message in messages)
+        digest = hashlib.sha256(f"{model}\n{prompt}".encode()).hexdigest()
+        max_tokens = (options or {}).get("num_predict", 1000)
+        words = [f"stub-{digest[i:i + 8]}" for i in range(0, 32, 8)][:max_tokens]
+
+        async def chunks():
+            for word in words:
+                await asyncio.sleep(self.latency_s / (len(words) + 1))
+                yield {
+                    "model": model,
+                    "message": {"role": "assistant", "content": word + " "},
+                    "done": False,
+                }
+            await asyncio.sleep(self.latency_s / (len(words) + 1))
+            yield {
+                "model": model,
+                "created_at": _now(),
+                "message": {"role": "assistant", "content": ""},
+                "done": True,
+                "done_reason": "stop",
+                "prompt_eval_count": max(len(prompt) // 4, 1),
+                "eval_count": len(words),
+                "total_duration": int(self.latency_s * 1e9),
+                "load_duration": 0,
+                "prompt_eval_duration": 0,
+                "eval_duration": int(self.latency_s * 1e9),
+            }
+
+        return chunks()
+
+    async def embed(self, model, input, keep_alive=None):
+        vector = await self.embedder(input)
+        return {"embeddings": [vector.tolist()]}
+
+    async def list(self):
+        return {
+            "models": [
+                {"model": model, "name": model, "digest": "stub"}
+                for model in sorted(self.models)
+            ]
+        }
+
+
+def create_backend(url: str, **client_kwargs) -> InferenceBackend:
+    """The backend for a host URL: `stub://` for the stub,
+    `openai+http(s)://...` for an OpenAI-compatible server, anything else is
+    an Ollama host.
+    """
+    if url.startswith("stub://"):
+        return StubBackend()
+    if url.startswith("openai+"):
+        return OpenAICompatibleBackend(
+            url[len("openai+") :],
+            api_key=os.getenv("OPENAI_COMPATIBLE_API_KEY"),
+            **client_kwargs,
+        )
+    return OllamaBackend(url, **client_kwargs)
+
+
+def as_dict(response) -> dict:
+    """Newer ollama versions return pydantic models instead of dicts."""
+    if hasattr(response, "model_dump"):
+        return response.model_dump(exclude_none=True)
+    return dict(response)
+
+
+def _normalized_listing(listing: dict) -> dict:
+    models = []
+    for entry in listing.get("models", []):
+        entry = as_dict(entry)
+        name = entry.get("model") or entry.get("name")
+        models.append({**entry, "model": name, "name": name})
+    return {"models": models}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
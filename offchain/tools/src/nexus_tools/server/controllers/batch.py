@@ -0,0 +1,32 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def run_batch(
+    items: Sequence[T],
+    model_of: Callable[[T], str],
+    run: Callable[[T], Awaitable[R]],
+    per_model_concurrency: int,
+) -> List[Tuple[R, Exception]]:
+    """Runs `run` for all items concurrently, at most `per_model_concurrency`
+    at a time for the same model.
+
+    Returns a `(result, None)` or `(None, error)` pair per item, in the order
+    of `items`, so that one failing item does not fail the batch.
+    """
+    semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def run_one(item):
+        model = model_of(item)
+        if model not in semaphores:
+            semaphores[model] = asyncio.Semaphore(per_model_concurrency)
+        async with semaphores[model]:
+            try:
+                return await run(item), None
+            except Exception as e:
+                return None, e
+
+    return await asyncio.gather(*(run_one(item) for item in items))
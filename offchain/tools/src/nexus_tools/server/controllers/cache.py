@@ -0,0 +1,148 @@
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CompletionCache:
+    """Exact match cache of completions of deterministic requests.
+
+    Entries are keyed by model, model digest, prompt and options, so pulling
+    a new version of a model does not serve completions of the old one. The
+    memory tier is an LRU bounded by the size of the serialized completions,
+    the optional disk tier keeps one file per entry in `disk_dir`. Entries of
+    both tiers expire after `ttl_s`. The disk tier is best effort: entries
+    that cannot be written stay in memory only, and files that cannot be read
+    or parsed are misses.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_s: float = 3600,
+        disk_dir: Optional[str] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        # key -> (expires at, serialized completion)
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["CompletionCache"]:
+        """The cache configured by the PREDICT_CACHE* variables, if enabled."""
+        if os.getenv("PREDICT_CACHE", "").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(
+            max_bytes=int(float(os.getenv("PREDICT_CACHE_MAX_MB", "64")) * 1024 * 1024),
+            ttl_s=float(os.getenv("PREDICT_CACHE_TTL_S", "3600")),
+            disk_dir=os.getenv("PREDICT_CACHE_DIR"),
+        )
+
+    @staticmethod
+    def key(model: str, digest: str, prompt: str, options: dict) -> str:
+        material = json.dumps([model, digest, prompt, options], sort_keys=True)
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    async def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, data = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(data)
+            self._remove(key)
+
+        if self.disk_dir is not None:
+            data = await asyncio.to_thread(self._read_disk, key)
+            completion = self._parse_disk(key, data) if data is not None else None
+            if completion is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                self._store(key, data)
+                return completion
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, completion: dict):
+        data = json.dumps(completion)
+        self._store(key, data)
+        if self.disk_dir is not None:
+            await asyncio.to_thread(self._write_disk, key, data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+    def _store(self, key: str, data: str):
+        if len(data) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl_s, data)
+        self._bytes += len(data)
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        _, data = self._entries.pop(key)
+        self._bytes -= len(data)
+
+    def _parse_disk(self, key: str, data: str) -> Optional[dict]:
+        try:
+            return json.loads(data)
+        except ValueError as e:
+            logger.warning("Removing corrupt cache entry %s: %s", key, e)
+            with contextlib.suppress(OSError):
+                (self.disk_dir / f"{key}.json").unlink()
+            return None
+
+    def _read_disk(self, key: str) -> Optional[str]:
+        path = self.disk_dir / f"{key}.json"
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl_s:
+                path.unlink()
+                return None
+            return path.read_text()
+        except FileNotFoundError:
+            return None
+        except (OSError, UnicodeDecodeError) as e:
+            logger.warning("Cannot read cache entry %s: %s", key, e)
+            return None
+
+    def _write_disk(self, key: str, data: str):
+        # Write and rename so that readers never see a partial entry
+        tmp_path = self.disk_dir / f".{key}.tmp"
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(data)
+            os.replace(tmp_path, self.disk_dir / f"{key}.json")
+        except OSError as e:
+            logger.warning("Cannot write cache entry %s to disk: %s", key, e)
+            with contextlib.suppress(OSError):
+                tmp_path.unlink()
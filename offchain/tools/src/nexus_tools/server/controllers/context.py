@@ -0,0 +1,108 @@
+import logging
+import math
+import os
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Conservative, most tokenizers average 3.5 to 4 characters per token on
+# English text and fewer on code
+CHARS_PER_TOKEN = 3
+
+DEFAULT_BUCKETS = [2048, 4096, 8192, 16384]
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+class ContextBuckets:
+    """Picks Ollama's `num_ctx` for a request from a few sizes per model.
+
+    Ollama reloads a model whenever a request asks for a different context
+    size than the loaded instance has. Requests therefore get the smallest
+    bucket that fits their prompt and `num_predict`, unless the instance
+    already loaded has a larger bucket, which is then reused as is. A model is
+    only reloaded to grow its context. The loaded context is tracked per host,
+    since every host loads its own instance of a model.
+    """
+
+    def __init__(
+        self,
+        buckets: Optional[List[int]] = None,
+        model_buckets: Optional[Dict[str, List[int]]] = None,
+    ):
+        self.buckets = sorted(buckets or DEFAULT_BUCKETS)
+        self.model_buckets = {
+            model: sorted(sizes) for model, sizes in (model_buckets or {}).items()
+        }
+        self._loaded: Dict[Tuple[str, str], int] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def from_env(cls) -> "ContextBuckets":
+        """Buckets from NUM_CTX_BUCKETS, e.g. `2048,8192`, and per model from
+        NUM_CTX_MODEL_BUCKETS, e.g. `llama3.2:1b=2048/8192,mistral=4096/32768`.
+        """
+        buckets = [
+            int(size) for size in os.getenv("NUM_CTX_BUCKETS", "").split(",") if size
+        ]
+        model_buckets = {}
+        for item in os.getenv("NUM_CTX_MODEL_BUCKETS", "").split(","):
+            if "=" in item:
+                model, sizes = item.rsplit("=", 1)
+                model_buckets[model.strip()] = [int(size) for size in sizes.split("/")]
+        return cls(buckets, model_buckets)
+
+    def num_ctx(self, host: str, model: str, prompt: str, max_tokens: int) -> int:
+        needed = estimate_tokens(prompt) + max_tokens
+        buckets = self.model_buckets.get(model, self.buckets)
+        counters = self._model_counters(model)
+
+        fitting = [size for size in buckets if size >= needed]
+        if fitting:
+            size = fitting[0]
+        else:
+            size = buckets[-1]
+            counters["overflows"] += 1
+            logger.warning(
+                "Prompt of about %d tokens does not fit the largest context of %s (%d)",
+                needed,
+                model,
+                size,
+            )
+
+        loaded = self._loaded.get((host, model))
+        if loaded is not None and loaded >= size:
+            size = loaded
+        elif loaded is not None:
+            counters["reloads"] += 1
+        self._loaded[(host, model)] = size
+
+        counters[f"requests_{size}"] = counters.get(f"requests_{size}", 0) + 1
+        return size
+
+    def forget(self, host: str, model: str):
+        """The model was unloaded from `host`, its next request there may pick
+        a smaller bucket.
+        """
+        self._loaded.pop((host, model), None)
+        self._loaded.pop((host, model.removesuffix(":latest")), None)
+
+    def stats(self) -> dict:
+        return {
+            model: {
+                "loaded_num_ctx": {
+                    host: size
+                    for (host, loaded_model), size in self._loaded.items()
+                    if loaded_model == model
+                },
+                **counters,
+            }
+            for model, counters in self._counters.items()
+        }
+
+    def _model_counters(self, model: str) -> Dict[str, int]:
+        if model not in self._counters:
+            self._counters[model] = {"reloads": 0, "overflows": 0}
+        return self._counters[model]
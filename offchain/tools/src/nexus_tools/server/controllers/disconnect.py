@@ -0,0 +1,32 @@
+import asyncio
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+async def cancel_on_disconnect(request, coro):
+    """Awaits `coro`, cancelling it if the client goes away first.
+
+    Cancelling an Ollama request closes its connection, which makes Ollama
+    stop generating.
+    """
+
+    async def wait_for_disconnect():
+        # The body has been read, so the next message is the disconnect
+        while (await request.receive())["type"] != "http.disconnect":
+            pass
+
+    task = asyncio.ensure_future(coro)
+    watcher = asyncio.ensure_future(wait_for_disconnect())
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+            await asyncio.wait({task})
+
+    if task.cancelled():
+        raise ClientDisconnected()
+    return task.result()
@@ -0,0 +1,85 @@
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from .scheduler import Scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class FallbackPolicy:
+    """Sends requests for an overloaded model to a smaller one.
+
+    Each model can have a chain of fallbacks, e.g. smaller quantizations or
+    parameter counts. A model is overloaded once the wait the scheduler
+    expects for a new request has been over `wait_slo_s` for at least
+    `sustain_s`, so that a short burst does not degrade anything. A request
+    that allows it then goes to the first fallback whose own expected wait is
+    within the SLO, and otherwise waits for the model it asked for.
+    """
+
+    def __init__(
+        self,
+        chains: Optional[Dict[str, List[str]]] = None,
+        wait_slo_s: float = 10,
+        sustain_s: float = 5,
+    ):
+        self.chains = chains or {}
+        self.wait_slo_s = wait_slo_s
+        self.sustain_s = sustain_s
+        self._overloaded_since: Dict[str, float] = {}
+        self._fallbacks: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def from_env(cls) -> "FallbackPolicy":
+        """Chains from FALLBACK_MODELS, e.g. `llama3.1:70b=llama3.1:8b/llama3.2:1b`."""
+        chains = {}
+        for item in os.getenv("FALLBACK_MODELS", "").split(","):
+            if "=" in item:
+                model, fallbacks = item.rsplit("=", 1)
+                chains[model.strip()] = [m for m in fallbacks.split("/") if m]
+        return cls(
+            chains,
+            wait_slo_s=float(os.getenv("FALLBACK_WAIT_SLO_S", "10")),
+            sustain_s=float(os.getenv("FALLBACK_SUSTAIN_S", "5")),
+        )
+
+    def choose(self, model: str, scheduler: Scheduler) -> str:
+        """The model to run a request for `model` on right now."""
+        chain = self.chains.get(model)
+        if not chain or not self._overloaded(model, scheduler):
+            return model
+        for fallback in chain:
+            if scheduler.expected_wait_s(fallback) <= self.wait_slo_s:
+                return fallback
+        return model
+
+    def record(self, requested: str, used: str):
+        """A request for `requested` was sent to the fallback `used`."""
+        counts = self._fallbacks.setdefault(requested, {})
+        counts[used] = counts.get(used, 0) + 1
+        logger.info("Model %s is overloaded, used %s instead", requested, used)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            model: {
+                "fallbacks": chain,
+                "overloaded_for_s": (
+                    now - self._overloaded_since[model]
+                    if model in self._overloaded_since
+                    else None
+                ),
+                "requests_by_fallback": self._fallbacks.get(model, {}),
+            }
+            for model, chain in self.chains.items()
+        }
+
+    def _overloaded(self, model: str, scheduler: Scheduler) -> bool:
+        if scheduler.expected_wait_s(model) <= self.wait_slo_s:
+            self._overloaded_since.pop(model, None)
+            return False
+        now = time.monotonic()
+        since = self._overloaded_since.setdefault(model, now)
+        return now - since >= self.sustain_s
@@ -1,30 +1,291 @@
-import os
-import ollama
-from ollama import Client
+import logging
+import time
+from typing import Dict, Optional
+
+from .cache import CompletionCache
+from .context import ContextBuckets
+from .fallback import FallbackPolicy
+from .pool import BackendPool
+from .prefix import PrefixTracker
+from .scheduler import Scheduler
+from .semantic_cache import SemanticCache
+from .singleflight import SingleFlight
+from .usage import UsageMetrics
+
+logger = logging.getLogger(__name__)
+
+# How long the digests of the installed models are trusted before they are
+# listed again
+DIGEST_TTL_S = 60
 
 
 class Inference:
-    @staticmethod
-    def prompt(prompt, model, max_tokens=1000, temperature=1.0):
-        # Fetch the URL from environment variable, defaulting to localhost if not provided
-        ollama_host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+    """Long-lived gateway to the inference backends, Ollama by default.
+
+    Sends requests to the hosts of `pool`, each with one pooled HTTP client
+    whose connections are kept alive between requests. Created once at app
+    startup with `start` and released at shutdown with `close`.
+
+    Configured through environment variables:
+
+    - `OLLAMA_HOST` (default `http://localhost:11434`), or `OLLAMA_HOSTS` for
+      several hosts, see BackendPool and create_backend for other runtimes
+    - `OLLAMA_CONNECT_TIMEOUT_S` (default `10`): connecting to Ollama
+    - `OLLAMA_TIMEOUT_S` (default: none): reading a response, i.e. generation
+    - `OLLAMA_MAX_CONNECTIONS` (default `32`): per host
+    - `OLLAMA_KEEPALIVE_EXPIRY_S` (default `60`): how long idle connections are kept
+
+    Completions of deterministic requests, i.e. at temperature 0, are served
+    from `cache` if one is given. Requests for the models opted in to
+    `semantic_cache` can be served the completion of a similar prompt.
+    Requests that reach Ollama wait for a slot of `scheduler`, which may
+    reject them with QueueFull. If a `residency` manager is set, requests are
+    reported to it and keep their model loaded for as long as it says.
+    Their `num_ctx` is picked by `context` so that the model is reloaded as
+    rarely as possible, and `prefixes` reports how much prompt evaluation
+    Ollama saved by reusing the KV cache of shared prompt prefixes. Requests
+    that allow it are sent to a smaller model by `fallback` while theirs is
+    overloaded, the response then names the model used and the one asked for
+    as `fallback_from`. Identical requests arriving while one of them runs
+    share its completion through `singleflight`, deterministic ones always
+    and others if they opt in with `coalesce`. The token counts and timings
+    of every completion generated are aggregated per model in `usage`.
+    """
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        cache: Optional[CompletionCache] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        scheduler: Optional[Scheduler] = None,
+        context: Optional[ContextBuckets] = None,
+        pool: Optional[BackendPool] = None,
+        fallback: Optional[FallbackPolicy] = None,
+    ):
+        self.pool = pool or BackendPool.from_env(host)
+        self._started = False
+        self.cache = cache
+        self.semantic_cache = semantic_cache
+        self.scheduler = scheduler or Scheduler()
+        self.residency = None
+        self.context = context or ContextBuckets()
+        self.prefixes = PrefixTracker()
+        self.fallback = fallback or FallbackPolicy()
+        self.singleflight = SingleFlight()
+        self.usage = UsageMetrics()
+        self._digests: Dict[str, str] = {}
+        self._digests_listed_at: Optional[float] = None
+
+    async def start(self):
+        if not self._started:
+            await self.pool.start()
+            self._started = True
 
-        # Create a custom client with the specified host
-        client = Client(host=ollama_host)
+    async def close(self):
+        if self._started:
+            await self.pool.close()
+            self._started = False
+
+    def choose_model(self, model: str, allow_fallback: bool = False) -> str:
+        """The model a request for `model` is sent to."""
+        if not allow_fallback:
+            return model
+        return self.fallback.choose(model, self.scheduler)
+
+    async def prompt(
+        self,
+        prompt,
+        model,
+        max_tokens=1000,
+        temperature=1.0,
+        prefix_key=None,
+        allow_fallback=False,
+        coalesce=False,
+    ):
+        used = self.choose_model(model, allow_fallback)
+        if used != model:
+            self.fallback.record(model, used)
+
+        if temperature == 0 or coalesce:
+            options = {"temperature": temperature, "num_predict": max_tokens}
+            response = await self.singleflight.run(
+                self.singleflight.key(used, prompt, options),
+                lambda: self._prompt(prompt, used, max_tokens, temperature, prefix_key),
+            )
+        else:
+            response = await self._prompt(
+                prompt, used, max_tokens, temperature, prefix_key
+            )
+
+        if used != model:
+            return dict(response, model=used, fallback_from=model)
+        return response
+
+    async def _prompt(self, prompt, model, max_tokens, temperature, prefix_key):
+        await self.start()
 
         # Set up options for the request
         options = {"temperature": temperature, "num_predict": max_tokens}
 
-        # Make the request using the client
-        response = client.chat(
-            model=model,
-            options=options,
-            messages=[
+        cache_key = None
+        if self.cache is not None and temperature == 0:
+            digest = await self.model_digest(model)
+            if digest:
+                cache_key = self.cache.key(model, digest, prompt, options)
+                cached = await self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
+
+        embedding = None
+        if self.semantic_cache is not None and self.semantic_cache.enabled_for(model):
+            try:
+                embedding = await self.semantic_cache.embed(prompt)
+            except Exception as e:
+                logger.warning("Cannot embed prompt for the semantic cache: %s", e)
+            if embedding is not None:
+                similar = self.semantic_cache.lookup(model, options, embedding)
+                if similar is not None:
+                    return similar
+
+        # Make the request using the pooled backend. The async client keeps the
+        # event loop free while the model generates, so concurrent requests
+        # overlap and use Ollama's parallel slots
+        shared_chars = self.prefixes.observe(model, prompt, prefix_key)
+        async with self.scheduler.slot(model):
+            keep_alive = self.keep_alive(model)
+            messages = [
                 {
                     "role": "user",
                     "content": prompt,
                 },
-            ],
-        )
+            ]
+            # num_ctx is picked per host, each has its own instance of the model
+            response = await self.pool.run(
+                model,
+                lambda host: host.backend.chat(
+                    model=model,
+                    options=self._with_num_ctx(
+                        options, host, model, prompt, max_tokens
+                    ),
+                    keep_alive=keep_alive,
+                    messages=messages,
+                ),
+            )
 
+        self.usage.record(model, response)
+        self.prefixes.record(
+            model, prompt, shared_chars, response.get("prompt_eval_count") or 0
+        )
+        if cache_key is not None:
+            await self.cache.put(cache_key, response)
+        if embedding is not None:
+            self.semantic_cache.add(model, options, embedding, response)
         return response
+
+    async def model_digest(self, model: str) -> Optional[str]:
+        """The digest of the installed version of `model`, None if unknown."""
+        now = time.monotonic()
+        if (
+            self._digests_listed_at is None
+            or now - self._digests_listed_at > DIGEST_TTL_S
+        ):
+            try:
+                listing = await self.pool.run(model, lambda host: host.backend.list())
+            except Exception as e:
+                logger.warning("Cannot list models to get their digests: %s", e)
+                return None
+            self._digests = {}
+            for entry in listing["models"]:
+                if entry.get("digest"):
+                    self._digests[entry["model"]] = entry["digest"]
+            self._digests_listed_at = now
+        return self._digests.get(model) or self._digests.get(f"{model}:latest")
+
+    def stream(
+        self,
+        prompt,
+        model,
+        max_tokens=1000,
+        temperature=1.0,
+        prefix_key=None,
+        allow_fallback=False,
+    ):
+        """Returns the chunks of a completion as Ollama generates them.
+
+        Every chunk carries a piece of `message.content`, the last one has
+        `done` set and the token counts and durations. The model is chosen and
+        admitted right away, so QueueFull is raised before anything streams.
+        """
+        used = self.choose_model(model, allow_fallback)
+        self.scheduler.admit(used)
+        if used != model:
+            self.fallback.record(model, used)
+        return self._stream(prompt, used, model, max_tokens, temperature, prefix_key)
+
+    async def _stream(
+        self, prompt, model, requested, max_tokens, temperature, prefix_key
+    ):
+        await self.start()
+
+        options = {"temperature": temperature, "num_predict": max_tokens}
+        shared_chars = self.prefixes.observe(model, prompt, prefix_key)
+        async with self.scheduler.slot(model):
+            keep_alive = self.keep_alive(model)
+            messages = [
+                {
+                    "role": "user",
+                    "content": prompt,
+                },
+            ]
+            # num_ctx is picked per host, each has its own instance of the model
+            chunks = self.pool.stream(
+                model,
+                lambda host: host.backend.chat_stream(
+                    model=model,
+                    options=self._with_num_ctx(
+                        options, host, model, prompt, max_tokens
+                    ),
+                    keep_alive=keep_alive,
+                    messages=messages,
+                ),
+            )
+            async for chunk in chunks:
+                if chunk.get("done"):
+                    self.usage.record(model, chunk)
+                    self.prefixes.record(
+                        model, prompt, shared_chars, chunk.get("prompt_eval_count") or 0
+                    )
+                    if model != requested:
+                        chunk = dict(chunk, model=model, fallback_from=requested)
+                yield chunk
+
+    async def list_models(self) -> list:
+        """The models of all hosts, each listed once."""
+        await self.start()
+        models = {}
+        for host in self.pool.hosts:
+            try:
+                listing = await host.backend.list()
+            except Exception as e:
+                logger.warning("Cannot list the models of %s: %s", host.url, e)
+                continue
+            for entry in listing["models"]:
+                if host.serves(entry["model"]):
+                    models.setdefault(entry["model"], entry)
+        return list(models.values())
+
+    def _with_num_ctx(
+        self, options: dict, host, model: str, prompt: str, max_tokens: int
+    ):
+        # Not part of the options the caches are keyed by, the context size
+        # does not change the completion of a prompt that fits
+        return dict(
+            options, num_ctx=self.context.num_ctx(host.url, model, prompt, max_tokens)
+        )
+
+    def keep_alive(self, model: str):
+        """Ollama's keep_alive for a request for `model`, None for its default."""
+        if self.residency is None:
+            return None
+        self.residency.record_use(model)
+        return self.residency.keep_alive_for(model)
@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+import httpx
+
+from .backends import InferenceBackend, create_backend
+
+logger = logging.getLogger(__name__)
+
+# Weight of the latest request in the moving average of latencies
+LATENCY_ALPHA = 0.2
+
+# Status codes of backend responses after which another host is tried
+FAILOVER_STATUS_CODES = {502, 503, 504}
+
+
+class NoBackendAvailable(Exception):
+    pass
+
+
+class Host:
+    """One inference server of the pool."""
+
+    def __init__(self, url: str, models: Optional[Set[str]] = None):
+        self.url = url
+        # None if the host serves any model
+        self.models = models
+        self.backend: Optional[InferenceBackend] = None
+        self.healthy = True
+        self.resident: Set[str] = set()
+        self.in_flight = 0
+        self.latency_s: Optional[float] = None
+        self.requests = 0
+        self.failures = 0
+
+    def serves(self, model: str) -> bool:
+        return self.models is None or model in self.models
+
+    def has_resident(self, model: str) -> bool:
+        return model in self.resident or f"{model}:latest" in self.resident
+
+    def observe_latency(self, elapsed_s: float):
+        if self.latency_s is None:
+            self.latency_s = elapsed_s
+        else:
+            self.latency_s += LATENCY_ALPHA * (elapsed_s - self.latency_s)
+
+
+class BackendPool:
+    """Routes requests over one or more inference hosts.
+
+    A request goes to a healthy host serving its model, preferring hosts that
+    have the model loaded, and among those the one with the lowest expected
+    wait: requests in flight times recent latency. If the host cannot be
+    reached or fails with a gateway error before answering, the request is
+    retried on the next best host. Every `health_check_s` the hosts are asked
+    which models they have loaded, hosts that do not answer are skipped until
+    they do again.
+    """
+
+    def __init__(self, hosts: List[Host], health_check_s: float = 10):
+        self.hosts = hosts
+        self.health_check_s = health_check_s
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls, host: Optional[str] = None) -> "BackendPool":
+        """Hosts from OLLAMA_HOSTS, e.g. `http://a:11434=llama3.2:1b|mistral,http://b:11434`
+        where a host without `=` serves any model, or else the single OLLAMA_HOST.
+        See create_backend for URLs of other runtimes than Ollama.
+        """
+        hosts = []
+        for item in os.getenv("OLLAMA_HOSTS", "").split(","):
+            item = item.strip()
+            if not item:
+                continue
+            # The URL itself contains `:` but never `=`
+            url, _, models = item.partition("=")
+            hosts.append(
+                Host(url, set(models.split("|")) if models else None),
+            )
+        if not hosts:
+            hosts = [Host(host or os.getenv("OLLAMA_HOST", "http://localhost:11434"))]
+        return cls(hosts, float(os.getenv("OLLAMA_HEALTH_CHECK_S", "10")))
+
+    async def start(self):
+        read_timeout = os.getenv("OLLAMA_TIMEOUT_S")
+        max_connections = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "32"))
+        for host in self.hosts:
+            if host.backend is None:
+                host.backend = create_backend(
+                    host.url,
+                    timeout=httpx.Timeout(
+                        float(read_timeout) if read_timeout else None,
+                        connect=float(os.getenv("OLLAMA_CONNECT_TIMEOUT_S", "10")),
+                    ),
+                    limits=httpx.Limits(
+                        max_connections=max_connections,
+                        max_keepalive_connections=max_connections,
+                        keepalive_expiry=float(
+                            os.getenv("OLLAMA_KEEPALIVE_EXPIRY_S", "60")
+                        ),
+                    ),
+                )
+        if self._task is None and len(self.hosts) > 1:
+            self._task = asyncio.create_task(self._check_health_forever())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for host in self.hosts:
+            if host.backend is not None:
+                await host.backend.close()
+                host.backend = None
+
+    def pick(self, model: str, exclude: Set[str] = frozenset()) -> Host:
+        candidates = [
+            host
+            for host in self.hosts
+            if host.serves(model) and host.healthy and host.url not in exclude
+        ]
+        if not candidates:
+            # Better to try a host that failed a health check than none at all
+            candidates = [
+                host
+                for host in self.hosts
+                if host.serves(model) and host.url not in exclude
+            ]
+        if not candidates:
+            raise NoBackendAvailable(f"No Ollama host serves model {model}")
+
+        known = [host.latency_s for host in candidates if host.latency_s is not None]
+        default_latency_s = sum(known) / len(known) if known else 1.0
+        return min(
+            candidates,
+            key=lambda host: (
+                not host.has_resident(model),
+                (host.in_flight + 1) * (host.latency_s or default_latency_s),
+            ),
+        )
+
+    def hosts_for(self, model: str) -> List[Host]:
+        return [host for host in self.hosts if host.serves(model)]
+
+    async def run(self, model: str, call: Callable[[Host], Awaitable]):
+        """Awaits `call` with the best host for `model`, failing over to the
+        other hosts if a host cannot answer.
+        """
+        tried: Set[str] = set()
+        while True:
+            host = self.pick(model, tried)
+            tried.add(host.url)
+            host.in_flight += 1
+            started = time.monotonic()
+            try:
+                result = await call(host)
+            except Exception as e:
+                if not self._should_fail_over(host, e):
+                    raise
+                if not self._others_left(model, tried):
+                    raise
+                logger.warning("Ollama host %s failed, trying another: %s", host.url, e)
+                continue
+            finally:
+                host.in_flight -= 1
+            host.requests += 1
+            host.observe_latency(time.monotonic() - started)
+            return result
+
+    async def stream(self, model: str, call: Callable[[Host], Awaitable]):
+        """Like `run` for a call returning a stream of chunks. A host is only
+        failed over until its first chunk, later failures end the stream.
+        """
+        tried: Set[str] = set()
+        while True:
+            host = self.pick(model, tried)
+            tried.add(host.url)
+            host.in_flight += 1
+            started = time.monotonic()
+            first = True
+            try:
+                async for chunk in await call(host):
+                    first = False
+                    yield chunk
+            except Exception as e:
+                if not first or not self._should_fail_over(host, e):
+                    raise
+                if not self._others_left(model, tried):
+                    raise
+                logger.warning("Ollama host %s failed, trying another: %s", host.url, e)
+                continue
+            finally:
+                host.in_flight -= 1
+            host.requests += 1
+            host.observe_latency(time.monotonic() - started)
+            return
+
+    async def check_health(self):
+        for host in self.hosts:
+            try:
+                listing = await host.backend.ps()
+                host.resident = {model["model"] for model in listing["models"]}
+                if not host.healthy:
+                    logger.info("Ollama host %s is back", host.url)
+                host.healthy = True
+            except Exception as e:
+                if host.healthy:
+                    logger.warning("Ollama host %s is unhealthy: %s", host.url, e)
+                host.healthy = False
+
+    def stats(self) -> Dict[str, dict]:
+        return {
+            host.url: {
+                "healthy": host.healthy,
+                "models": sorted(host.models) if host.models is not None else None,
+                "resident": sorted(host.resident),
+                "in_flight": host.in_flight,
+                "latency_s": host.latency_s,
+                "requests": host.requests,
+                "failures": host.failures,
+            }
+            for host in self.hosts
+        }
+
+    def _should_fail_over(self, host: Host, error: Exception) -> bool:
+        if isinstance(error, (httpx.TransportError, ConnectionError)):
+            host.healthy = False
+        elif getattr(error, "status_code", None) not in FAILOVER_STATUS_CODES:
+            return False
+        host.failures += 1
+        return True
+
+    def _others_left(self, model: str, tried: Set[str]) -> bool:
+        return any(host.url not in tried for host in self.hosts_for(model))
+
+    async def _check_health_forever(self):
+        while True:
+            await self.check_health()
+            await asyncio.sleep(self.health_check_s)
@@ -0,0 +1,91 @@
+import os
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Weight of the latest cold request in the tokens per character estimate
+TOKENS_PER_CHAR_ALPHA = 0.2
+
+
+def common_prefix_length(a: str, b: str) -> int:
+    return len(os.path.commonprefix([a, b]))
+
+
+class PrefixTracker:
+    """Measures how much of each prompt Ollama did not have to evaluate.
+
+    Ollama keeps the evaluated tokens of a prompt in the KV cache of the slot
+    that ran it and, for the next prompt with the same beginning, only
+    evaluates what comes after the common prefix. Prompts of an agent start
+    with the same role, memory and cluster context, so this already saves
+    most of their prompt evaluation as long as that context comes first.
+
+    The tracker remembers the last prompt per prefix key (a cluster execution,
+    say, or else the model), finds the prefix a new prompt shares with it
+    and, from the tokens per character of prompts without a shared prefix,
+    estimates how many prompt tokens the reuse saved.
+    """
+
+    def __init__(self, max_keys: int = 1024, min_prefix_chars: int = 64):
+        self.max_keys = max_keys
+        self.min_prefix_chars = min_prefix_chars
+        self._last_prompts: "OrderedDict[str, str]" = OrderedDict()
+        self._tokens_per_char: Dict[str, float] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def observe(self, model: str, prompt: str, prefix_key: Optional[str]) -> int:
+        """Returns how many characters `prompt` shares with the last prompt
+        of its key, 0 if they share less than `min_prefix_chars`.
+        """
+        key = f"{model}\n{prefix_key or ''}"
+        previous = self._last_prompts.pop(key, None)
+        self._last_prompts[key] = prompt
+        if len(self._last_prompts) > self.max_keys:
+            self._last_prompts.popitem(last=False)
+
+        if previous is None:
+            return 0
+        shared = common_prefix_length(previous, prompt)
+        return shared if shared >= self.min_prefix_chars else 0
+
+    def record(
+        self, model: str, prompt: str, shared_chars: int, prompt_eval_count: int
+    ):
+        """Accounts for a completed request, `prompt_eval_count` is the number
+        of prompt tokens Ollama reported to have evaluated.
+        """
+        counters = self._model_counters(model)
+        counters["requests"] += 1
+        counters["prompt_eval_tokens"] += prompt_eval_count
+
+        if not shared_chars:
+            if prompt:
+                ratio = prompt_eval_count / len(prompt)
+                previous = self._tokens_per_char.get(model, ratio)
+                self._tokens_per_char[model] = previous + TOKENS_PER_CHAR_ALPHA * (
+                    ratio - previous
+                )
+            return
+
+        counters["shared_prefix_requests"] += 1
+        counters["shared_prefix_chars"] += shared_chars
+        tokens_per_char = self._tokens_per_char.get(model)
+        if tokens_per_char is not None:
+            expected = round(tokens_per_char * len(prompt))
+            counters["prompt_eval_tokens_saved"] += max(expected - prompt_eval_count, 0)
+
+    def stats(self) -> dict:
+        return {
+            model: {**counters, "tokens_per_char": self._tokens_per_char.get(model)}
+            for model, counters in self._counters.items()
+        }
+
+    def _model_counters(self, model: str) -> Dict[str, int]:
+        if model not in self._counters:
+            self._counters[model] = {
+                "requests": 0,
+                "shared_prefix_requests": 0,
+                "shared_prefix_chars": 0,
+                "prompt_eval_tokens": 0,
+                "prompt_eval_tokens_saved": 0,
+            }
+        return self._counters[model]
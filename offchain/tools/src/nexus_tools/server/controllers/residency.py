@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# keep_alive values understood by Ollama: forever and unload now
+KEEP_FOREVER = -1
+UNLOAD = 0
+
+
+class ResidencyManager:
+    """Keeps the models that serve traffic loaded in Ollama.
+
+    The `pinned_models` are loaded when the server starts, never unloaded and
+    loaded again if Ollama lost them, e.g. after a restart. Other models are
+    loaded on first use and kept for `keep_alive` after each request. Every
+    `refresh_s` the manager unloads models that have not been used for
+    `idle_evict_s`, and if less than `min_free_bytes` of memory is available,
+    the least recently used unpinned models until there is enough. Models
+    with requests in flight are never unloaded.
+
+    All of this is done on every host of the pool serving the model. Memory
+    is read from /proc/meminfo, so eviction on memory pressure only applies
+    to a pool of a single host, which should run on the same machine.
+    """
+
+    def __init__(
+        self,
+        inference,
+        pinned_models: Set[str],
+        keep_alive: str = "30m",
+        refresh_s: float = 60,
+        idle_evict_s: float = 1800,
+        min_free_bytes: int = 0,
+    ):
+        self.inference = inference
+        self.pinned_models = {canonical(model) for model in pinned_models}
+        self.keep_alive = keep_alive
+        self.refresh_s = refresh_s
+        self.idle_evict_s = idle_evict_s
+        self.min_free_bytes = min_free_bytes
+        self.evictions = 0
+        self.loads = 0
+        self._last_used: Dict[str, float] = {}
+        self._requests: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls, inference) -> "ResidencyManager":
+        return cls(
+            inference,
+            pinned_models={
+                model.strip()
+                for model in os.getenv("RESIDENCY_PINNED_MODELS", "").split(",")
+                if model.strip()
+            },
+            keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+            refresh_s=float(os.getenv("RESIDENCY_REFRESH_S", "60")),
+            idle_evict_s=float(os.getenv("RESIDENCY_IDLE_EVICT_S", "1800")),
+            min_free_bytes=int(float(os.getenv("RESIDENCY_MIN_FREE_MB", "0")) * 2**20),
+        )
+
+    def keep_alive_for(self, model: str):
+        if canonical(model) in self.pinned_models:
+            return KEEP_FOREVER
+        return self.keep_alive
+
+    def record_use(self, model: str):
+        model = canonical(model)
+        self._last_used[model] = time.monotonic()
+        self._requests[model] = self._requests.get(model, 0) + 1
+
+    async def start(self):
+        """Warms the pinned models and refreshes residency in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def refresh(self):
+        for host in self.inference.pool.hosts:
+            try:
+                await self._refresh_host(host)
+            except Exception as e:
+                logger.warning("Cannot refresh model residency on %s: %s", host.url, e)
+
+    async def resident(self, host) -> Dict[str, dict]:
+        """The models `host` has loaded, by name."""
+        listing = await host.backend.ps()
+        resident = {}
+        for entry in listing["models"]:
+            resident[canonical(entry["model"])] = entry
+        return resident
+
+    async def state(self) -> dict:
+        now = time.monotonic()
+        hosts = {}
+        resident_on: Dict[str, list] = {}
+        for host in self.inference.pool.hosts:
+            try:
+                resident = await self.resident(host)
+            except Exception as e:
+                hosts[host.url] = {"error": str(e)}
+                continue
+            hosts[host.url] = {
+                model: {
+                    "size": entry.get("size"),
+                    "size_vram": entry.get("size_vram"),
+                    "expires_at": str(entry.get("expires_at")),
+                }
+                for model, entry in resident.items()
+            }
+            for model in resident:
+                resident_on.setdefault(model, []).append(host.url)
+
+        models = set(resident_on) | self.pinned_models | set(self._last_used)
+        return {
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "available_memory_bytes": available_memory_bytes(),
+            "hosts": hosts,
+            "models": {
+                model: {
+                    "resident_on": resident_on.get(model, []),
+                    "pinned": model in self.pinned_models,
+                    "requests": self._requests.get(model, 0),
+                    "idle_s": (
+                        now - self._last_used[model]
+                        if model in self._last_used
+                        else None
+                    ),
+                }
+                for model in sorted(models)
+            },
+        }
+
+    async def _refresh_host(self, host):
+        resident = await self.resident(host)
+
+        for model in self.pinned_models - set(resident):
+            if _serves(host, model):
+                await self._load(host, model)
+
+        now = time.monotonic()
+        for model in list(resident):
+            # A model loaded by someone else, or before this server started,
+            # is idle from the moment it is first seen, not since boot
+            self._last_used.setdefault(model, now)
+            if self._evictable(model) and (
+                now - self._last_used[model] > self.idle_evict_s
+            ):
+                logger.info("Unloading idle model %s from %s", model, host.url)
+                await self._unload(host, model)
+                del resident[model]
+
+        # The memory of this machine only tells about a host if it is the only one
+        if self.min_free_bytes and len(self.inference.pool.hosts) == 1:
+            available = available_memory_bytes()
+            coldest_first = sorted(
+                (model for model in resident if self._evictable(model)),
+                key=lambda model: self._last_used.get(model, 0.0),
+            )
+            for model in coldest_first:
+                if available is None or available >= self.min_free_bytes:
+                    break
+                logger.info(
+                    "Unloading model %s, only %d bytes of memory available",
+                    model,
+                    available,
+                )
+                await self._unload(host, model)
+                available += resident[model].get("size") or 0
+
+    async def _run(self):
+        for host in self.inference.pool.hosts:
+            for model in self.pinned_models:
+                if _serves(host, model):
+                    await self._load(host, model)
+        while True:
+            await asyncio.sleep(self.refresh_s)
+            await self.refresh()
+
+    async def _load(self, host, model: str):
+        # A request without a prompt only loads the model
+        try:
+            await host.backend.generate(
+                model=model, keep_alive=self.keep_alive_for(model)
+            )
+            self.loads += 1
+            logger.info("Loaded model %s on %s", model, host.url)
+        except Exception as e:
+            logger.warning("Cannot load model %s on %s: %s", model, host.url, e)
+
+    async def _unload(self, host, model: str):
+        await host.backend.generate(model=model, keep_alive=UNLOAD)
+        self.inference.context.forget(host.url, model)
+        self.evictions += 1
+
+    def _evictable(self, model: str) -> bool:
+        if model in self.pinned_models:
+            return False
+        # Requests may name the model with or without the default tag
+        scheduler = self.inference.scheduler
+        untagged = model.removesuffix(":latest")
+        return scheduler.running_for(model) + scheduler.running_for(untagged) == 0
+
+
+def _serves(host, model: str) -> bool:
+    return host.serves(model) or host.serves(model.removesuffix(":latest"))
+
+
+def canonical(model: str) -> str:
+    """The name Ollama lists `model` under."""
+    return model if ":" in model else f"{model}:latest"
+
+
+def available_memory_bytes() -> Optional[int]:
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
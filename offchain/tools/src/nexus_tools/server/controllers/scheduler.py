@@ -0,0 +1,211 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+
+# Weight of the latest request in the moving average of service times
+SERVICE_TIME_ALPHA = 0.2
+
+
+class QueueFull(Exception):
+    """The queue of a model is full, the caller should retry later."""
+
+    def __init__(self, model: str, retry_after_s: int):
+        super().__init__(f"Too many queued requests for model {model}")
+        self.model = model
+        self.retry_after_s = retry_after_s
+
+
+class _ModelQueue:
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.running = 0
+        # Virtual time of the model in the fair share, advanced by 1 / weight
+        # for every granted request
+        self.virtual_time = 0.0
+        self.service_time_s: Optional[float] = None
+        self.granted = 0
+        self.rejected = 0
+        self.wait_s_sum = 0.0
+        self.wait_s_max = 0.0
+
+
+class Scheduler:
+    """Admission control and fair queueing of inference requests.
+
+    At most `capacity` requests run at the same time, and at most
+    `model_concurrency` of them for the same model. Requests beyond that wait
+    in a queue per model of up to `max_queue` entries. When a slot frees up,
+    it goes to the model with waiters that has received the least service
+    relative to its weight (default 1), so a burst on one model cannot starve
+    the others. A request that finds its queue full is rejected with
+    QueueFull.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 4,
+        model_concurrency: Optional[int] = None,
+        max_queue: int = 64,
+        weights: Optional[Dict[str, float]] = None,
+    ):
+        self.capacity = capacity
+        self.model_concurrency = model_concurrency or capacity
+        self.max_queue = max_queue
+        self.weights = weights or {}
+        self.running = 0
+        self._queues: Dict[str, _ModelQueue] = {}
+
+    @classmethod
+    def from_env(cls) -> "Scheduler":
+        weights = {}
+        for item in os.getenv("SCHEDULER_WEIGHTS", "").split(","):
+            if "=" in item:
+                model, weight = item.rsplit("=", 1)
+                weights[model.strip()] = float(weight)
+        model_concurrency = os.getenv("SCHEDULER_MODEL_CONCURRENCY")
+        return cls(
+            capacity=int(os.getenv("SCHEDULER_CAPACITY", "4")),
+            model_concurrency=int(model_concurrency) if model_concurrency else None,
+            max_queue=int(os.getenv("SCHEDULER_MAX_QUEUE", "64")),
+            weights=weights,
+        )
+
+    def admit(self, model: str):
+        """Raises QueueFull if a request for `model` would be rejected now."""
+        queue = self._queue(model)
+        if len(queue.waiters) >= self.max_queue:
+            queue.rejected += 1
+            raise QueueFull(model, self._retry_after_s(queue))
+
+    @asynccontextmanager
+    async def slot(self, model: str):
+        """Waits for and holds a slot to run a request for `model`."""
+        queue = self._queue(model)
+        started = time.monotonic()
+        await self._acquire(model, queue)
+        waited = time.monotonic() - started
+        queue.wait_s_sum += waited
+        queue.wait_s_max = max(queue.wait_s_max, waited)
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            if queue.service_time_s is None:
+                queue.service_time_s = elapsed
+            else:
+                queue.service_time_s += SERVICE_TIME_ALPHA * (
+                    elapsed - queue.service_time_s
+                )
+            queue.running -= 1
+            self.running -= 1
+            self._dispatch()
+
+    def expected_wait_s(self, model: str) -> float:
+        """How long a request for `model` arriving now would likely wait."""
+        queue = self._queues.get(model)
+        if queue is None or (not queue.waiters and self._can_run(queue)):
+            return 0.0
+        return self._expected_wait_s(queue)
+
+    def running_for(self, model: str) -> int:
+        queue = self._queues.get(model)
+        return queue.running if queue else 0
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "running": self.running,
+            "models": {
+                model: {
+                    "running": queue.running,
+                    "queued": len(queue.waiters),
+                    "granted": queue.granted,
+                    "rejected": queue.rejected,
+                    "mean_wait_s": (
+                        queue.wait_s_sum / queue.granted if queue.granted else 0.0
+                    ),
+                    "max_wait_s": queue.wait_s_max,
+                    "mean_service_s": queue.service_time_s,
+                }
+                for model, queue in self._queues.items()
+            },
+        }
+
+    async def _acquire(self, model: str, queue: _ModelQueue):
+        if not queue.waiters and not queue.running:
+            # A model that was idle joins at the current virtual time instead
+            # of catching up on the service it did not ask for
+            active = [
+                other.virtual_time
+                for other in self._queues.values()
+                if other.waiters or other.running
+            ]
+            if active:
+                queue.virtual_time = max(queue.virtual_time, min(active))
+
+        if not queue.waiters and self._can_run(queue) and not self._anyone_waiting():
+            self._grant(queue)
+            return
+
+        self.admit(model)
+        waiter = asyncio.get_running_loop().create_future()
+        queue.waiters.append(waiter)
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just before being cancelled, hand the slot on
+                queue.running -= 1
+                self.running -= 1
+                self._dispatch()
+            elif waiter in queue.waiters:
+                queue.waiters.remove(waiter)
+            raise
+
+    def _dispatch(self):
+        while self.running < self.capacity:
+            eligible = [
+                queue
+                for queue in self._queues.values()
+                if queue.waiters and self._can_run(queue)
+            ]
+            if not eligible:
+                return
+            queue = min(eligible, key=lambda queue: queue.virtual_time)
+            waiter = queue.waiters.popleft()
+            if waiter.cancelled():
+                continue
+            self._grant(queue)
+            waiter.set_result(None)
+
+    def _grant(self, queue: _ModelQueue):
+        queue.running += 1
+        queue.granted += 1
+        queue.virtual_time += 1 / queue.weight
+        self.running += 1
+
+    def _can_run(self, queue: _ModelQueue) -> bool:
+        return self.running < self.capacity and queue.running < self.model_concurrency
+
+    def _anyone_waiting(self) -> bool:
+        return any(queue.waiters for queue in self._queues.values())
+
+    def _queue(self, model: str) -> _ModelQueue:
+        if model not in self._queues:
+            self._queues[model] = _ModelQueue(self.weights.get(model, 1.0))
+        return self._queues[model]
+
+    def _retry_after_s(self, queue: _ModelQueue) -> int:
+        return max(1, math.ceil(self._expected_wait_s(queue)))
+
+    def _expected_wait_s(self, queue: _ModelQueue) -> float:
+        service_time_s = queue.service_time_s or 1.0
+        return service_time_s * (len(queue.waiters) + 1) / self.model_concurrency
@@ -0,0 +1,181 @@
+import json
+import os
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Hits with a similarity this close below the threshold count as near misses,
+# a high share of them suggests the threshold is too strict
+NEAR_MISS_MARGIN = 0.05
+
+
+class OllamaEmbedder:
+    """Embeds prompts with an embedding model of the inference backends."""
+
+    def __init__(self, inference, model: str):
+        self.inference = inference
+        self.model = model
+
+    async def __call__(self, text: str) -> np.ndarray:
+        # Reported as a use so that the residency manager keeps the model
+        # loaded like any other that serves traffic
+        keep_alive = self.inference.keep_alive(self.model)
+        response = await self.inference.pool.run(
+            self.model,
+            lambda host: host.backend.embed(
+                model=self.model, input=text, keep_alive=keep_alive
+            ),
+        )
+        return np.asarray(response["embeddings"][0], dtype=np.float32)
+
+
+class _Index:
+    """Fixed capacity matrix of unit vectors with the completions they map to."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.vectors: Optional[np.ndarray] = None
+        self.completions: List[Optional[dict]] = [None] * capacity
+        self.expires_at = np.zeros(capacity)
+        self.last_used = np.zeros(capacity)
+        self.size = 0
+
+    def search(self, vector: np.ndarray, now: float) -> Tuple[int, float]:
+        if self.size == 0:
+            return -1, 0.0
+        scores = self.vectors[: self.size] @ vector
+        scores[self.expires_at[: self.size] <= now] = -1.0
+        best = int(np.argmax(scores))
+        return best, float(scores[best])
+
+    def add(self, vector: np.ndarray, completion: dict, expires_at: float, now: float):
+        if self.vectors is None:
+            self.vectors = np.zeros((self.capacity, vector.shape[0]), dtype=np.float32)
+        if self.size < self.capacity:
+            slot = self.size
+            self.size += 1
+        else:
+            # Reuse the slot of an expired entry, or else the least recently used
+            expired = np.flatnonzero(self.expires_at <= now)
+            slot = int(expired[0]) if len(expired) else int(np.argmin(self.last_used))
+        self.vectors[slot] = vector
+        self.completions[slot] = completion
+        self.expires_at[slot] = expires_at
+        self.last_used[slot] = now
+        return slot
+
+
+class SemanticCache:
+    """Serves the completion of a similar recent prompt.
+
+    Prompts of the opted-in `models` are embedded and compared by cosine
+    similarity with the recent prompts of the same model and options. If the
+    best match reaches `threshold`, its completion is returned instead of
+    running inference. Each model and options pair keeps up to `max_entries`
+    prompts, which expire after `ttl_s`.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        models: Set[str],
+        threshold: float = 0.95,
+        max_entries: int = 1024,
+        ttl_s: float = 3600,
+    ):
+        self.embedder = embedder
+        self.models = models
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._indexes: Dict[str, _Index] = {}
+        self._counters: Dict[str, Dict[str, float]] = {}
+
+    @classmethod
+    def from_env(cls, inference) -> Optional["SemanticCache"]:
+        """The cache configured by the SEMANTIC_CACHE* variables, if enabled."""
+        models = {
+            model.strip()
+            for model in os.getenv("SEMANTIC_CACHE_MODELS", "").split(",")
+            if model.strip()
+        }
+        if not models:
+            return None
+        return cls(
+            OllamaEmbedder(
+                inference, os.getenv("SEMANTIC_CACHE_EMBED_MODEL", "nomic-embed-text")
+            ),
+            models,
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+            max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1024")),
+            ttl_s=float(os.getenv("SEMANTIC_CACHE_TTL_S", "3600")),
+        )
+
+    def enabled_for(self, model: str) -> bool:
+        return model in self.models
+
+    async def embed(self, prompt: str) -> np.ndarray:
+        vector = np.asarray(await self.embedder(prompt), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, model: str, options: dict, vector: np.ndarray) -> Optional[dict]:
+        counters = self._model_counters(model)
+        counters["lookups"] += 1
+        index = self._indexes.get(self._index_key(model, options))
+        if index is None:
+            return None
+
+        now = time.monotonic()
+        slot, score = index.search(vector, now)
+        if slot < 0 or score < self.threshold:
+            if score >= self.threshold - NEAR_MISS_MARGIN:
+                counters["near_misses"] += 1
+            return None
+
+        index.last_used[slot] = now
+        counters["hits"] += 1
+        counters["hit_similarity_sum"] += score
+        return dict(index.completions[slot])
+
+    def add(self, model: str, options: dict, vector: np.ndarray, completion: dict):
+        key = self._index_key(model, options)
+        if key not in self._indexes:
+            self._indexes[key] = _Index(self.max_entries)
+        now = time.monotonic()
+        self._indexes[key].add(vector, completion, now + self.ttl_s, now)
+
+    def stats(self) -> dict:
+        stats = {}
+        for model, counters in self._counters.items():
+            lookups, hits = counters["lookups"], counters["hits"]
+            stats[model] = {
+                "lookups": int(lookups),
+                "hits": int(hits),
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "mean_hit_similarity": (
+                    counters["hit_similarity_sum"] / hits if hits else None
+                ),
+                "near_misses": int(counters["near_misses"]),
+                "entries": sum(
+                    index.size
+                    for key, index in self._indexes.items()
+                    if json.loads(key)[0] == model
+                ),
+            }
+        return stats
+
+    def _model_counters(self, model: str) -> Dict[str, float]:
+        if model not in self._counters:
+            self._counters[model] = {
+                "lookups": 0,
+                "hits": 0,
+                "hit_similarity_sum": 0.0,
+                "near_misses": 0,
+            }
+        return self._counters[model]
+
+    @staticmethod
+    def _index_key(model: str, options: dict) -> str:
+        return json.dumps([model, options], sort_keys=True)
@@ -0,0 +1,63 @@
+import asyncio
+import hashlib
+import json
+from typing import Awaitable, Callable, Dict
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Runs identical concurrent calls once.
+
+    The first caller of a key starts the call in a task of its own, callers
+    with the same key arriving while it runs wait for that task and get its
+    result, or its exception. A caller that is cancelled, e.g. because its
+    client disconnected, leaves the others waiting; the call is only
+    cancelled once nobody waits for it anymore.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def key(model: str, prompt: str, options: dict) -> str:
+        payload = json.dumps(
+            {"model": model, "prompt": prompt, "options": options}, sort_keys=True
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def run(self, key: str, call: Callable[[], Awaitable]):
+        flight = self._calls.get(key)
+        if flight is None:
+            flight = _Call(asyncio.ensure_future(call()))
+            self._calls[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                flight.task.cancel()
+                self._forget(key, flight)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
+
+    def _forget(self, key: str, flight: _Call):
+        if self._calls.get(key) is flight:
+            del self._calls[key]
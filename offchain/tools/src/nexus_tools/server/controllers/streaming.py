@@ -0,0 +1,54 @@
+import json
+import time
+from typing import AsyncIterator
+
+# Fields of Ollama's final chunk that are passed on in the summary record.
+# Durations are in nanoseconds.
+SUMMARY_FIELDS = (
+    "model",
+    "fallback_from",
+    "done_reason",
+    "prompt_eval_count",
+    "eval_count",
+    "total_duration",
+    "load_duration",
+    "prompt_eval_duration",
+    "eval_duration",
+)
+
+
+async def ndjson_stream(chunks: AsyncIterator[dict]) -> AsyncIterator[str]:
+    """Turns Ollama chat chunks into newline delimited JSON records.
+
+    Each piece of generated text is sent as `{"type": "token", "content": ...}`
+    as soon as it arrives. The stream ends with a `{"type": "done", ...}`
+    record holding the token counts and timings, including the time to first
+    token `ttft_ms` measured here, or with `{"type": "error", "detail": ...}`
+    if generation failed midway.
+    """
+    started = time.perf_counter()
+    ttft_ms = None
+    try:
+        async for chunk in chunks:
+            content = (chunk.get("message") or {}).get("content")
+            if content:
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started) * 1000
+                yield _record(type="token", content=content)
+
+            if chunk.get("done"):
+                summary = {
+                    field: chunk[field] for field in SUMMARY_FIELDS if field in chunk
+                }
+                yield _record(
+                    type="done",
+                    ttft_ms=ttft_ms,
+                    total_ms=(time.perf_counter() - started) * 1000,
+                    **summary,
+                )
+    except Exception as e:
+        yield _record(type="error", detail=str(e))
+
+
+def _record(**fields) -> str:
+    return json.dumps(fields) + "\n"
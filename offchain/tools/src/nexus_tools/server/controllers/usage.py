@@ -0,0 +1,130 @@
+import bisect
+from typing import Dict, List, Optional, Sequence
+
+# Upper bounds of the histogram buckets, the last bucket takes the rest
+LOAD_S_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 30)
+PROMPT_EVAL_S_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+TOKENS_PER_S_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Counts and durations (in nanoseconds) Ollama reports with a completion
+USAGE_FIELDS = (
+    "prompt_eval_count",
+    "eval_count",
+    "total_duration",
+    "load_duration",
+    "prompt_eval_duration",
+    "eval_duration",
+)
+
+
+def usage_of(response: dict) -> dict:
+    """The usage fields of a chat response that the backend reported."""
+    return {
+        field: response[field]
+        for field in USAGE_FIELDS
+        if response.get(field) is not None
+    }
+
+
+def tokens_per_s(tokens: Optional[int], duration_ns: Optional[int]) -> Optional[float]:
+    if not tokens or not duration_ns:
+        return None
+    return tokens / (duration_ns / 1e9)
+
+
+class Histogram:
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = list(bounds)
+        self.counts: List[int] = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def stats(self) -> dict:
+        labels = [f"le_{bound}" for bound in self.bounds] + ["le_inf"]
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else None,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class _ModelUsage:
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.eval_tokens = 0
+        self.prompt_eval_ns = 0
+        self.eval_ns = 0
+        self.loads = 0
+        self.load_s = Histogram(LOAD_S_BUCKETS)
+        self.prompt_eval_s = Histogram(PROMPT_EVAL_S_BUCKETS)
+        self.prompt_tokens_per_s = Histogram(TOKENS_PER_S_BUCKETS)
+        self.eval_tokens_per_s = Histogram(TOKENS_PER_S_BUCKETS)
+
+
+class UsageMetrics:
+    """Token counts and timings of completions, aggregated per model.
+
+    Every completion a backend generates is recorded with the counts and
+    durations it reported: totals of prompt and generated tokens for
+    charging, and histograms of load time, prompt evaluation time and
+    prompt and generation throughput for capacity planning. Completions
+    served from a cache did not run and are not recorded.
+    """
+
+    def __init__(self):
+        self._models: Dict[str, _ModelUsage] = {}
+
+    def record(self, model: str, response: dict):
+        usage = usage_of(response)
+        if not usage:
+            return
+        metrics = self._models.setdefault(model, _ModelUsage())
+        metrics.requests += 1
+        metrics.prompt_tokens += usage.get("prompt_eval_count", 0)
+        metrics.eval_tokens += usage.get("eval_count", 0)
+        metrics.prompt_eval_ns += usage.get("prompt_eval_duration", 0)
+        metrics.eval_ns += usage.get("eval_duration", 0)
+
+        # Ollama reports a few milliseconds of load time even when the model
+        # was loaded already
+        if usage.get("load_duration"):
+            load_s = usage["load_duration"] / 1e9
+            metrics.load_s.observe(load_s)
+            if load_s >= LOAD_S_BUCKETS[0]:
+                metrics.loads += 1
+        if usage.get("prompt_eval_duration"):
+            metrics.prompt_eval_s.observe(usage["prompt_eval_duration"] / 1e9)
+
+        prompt_rate = tokens_per_s(
+            usage.get("prompt_eval_count"), usage.get("prompt_eval_duration")
+        )
+        if prompt_rate is not None:
+            metrics.prompt_tokens_per_s.observe(prompt_rate)
+        eval_rate = tokens_per_s(usage.get("eval_count"), usage.get("eval_duration"))
+        if eval_rate is not None:
+            metrics.eval_tokens_per_s.observe(eval_rate)
+
+    def stats(self) -> dict:
+        return {
+            model: {
+                "requests": metrics.requests,
+                "prompt_tokens": metrics.prompt_tokens,
+                "eval_tokens": metrics.eval_tokens,
+                "prompt_tokens_per_s": tokens_per_s(
+                    metrics.prompt_tokens, metrics.prompt_eval_ns
+                ),
+                "eval_tokens_per_s": tokens_per_s(metrics.eval_tokens, metrics.eval_ns),
+                "loads": metrics.loads,
+                "load_s": metrics.load_s.stats(),
+                "prompt_eval_s": metrics.prompt_eval_s.stats(),
+                "prompt_tokens_per_s_per_request": metrics.prompt_tokens_per_s.stats(),
+                "eval_tokens_per_s_per_request": metrics.eval_tokens_per_s.stats(),
+            }
+            for model, metrics in self._models.items()
+        }
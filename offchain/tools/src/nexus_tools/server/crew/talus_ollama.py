@@ -126,7 +126,17 @@ class TalusOllama(BaseChatModel, _OllamaCommon):
         if final_chunk is None:
             raise ValueError("No data received from Ollama stream.")
 
-        self.completion_tokens = self._count_tokens(final_chunk.text)
+        # Ollama reports the tokens it evaluated with the last chunk. The prompt
+        # was charged with an estimate before calling the LLM, correct it
+        usage = final_chunk.generation_info or {}
+        prompt_eval_count = usage.get("prompt_eval_count")
+        if prompt_eval_count is not None and prompt_eval_count != self.prompt_tokens:
+            estimated_tokens = self.prompt_tokens
+            self.prompt_tokens = prompt_eval_count
+            self.correct_prompt_charges(estimated_tokens)
+        self.completion_tokens = usage.get("eval_count")
+        if self.completion_tokens is None:
+            self.completion_tokens = self._count_tokens(final_chunk.text)
         self.report_completion_charges()  # Report completion charges after receiving from LLM
         return final_chunk
 
@@ -164,6 +174,12 @@ class TalusOllama(BaseChatModel, _OllamaCommon):
         # TODO: Implement the logic to report prompt charges to the blockchain
         print(f"Reporting prompt charges: {self.prompt_tokens} tokens")
 
+    def correct_prompt_charges(self, estimated_tokens: int) -> None:
+        # TODO: Implement the logic to correct the reported prompt charges on the blockchain
+        print(
+            f"Correcting prompt charges: {self.prompt_tokens} tokens instead of {estimated_tokens}"
+        )
+
     def report_completion_charges(self) -> None:
         # TODO: Implement the logic to report completion charges to the blockchain
         print(f"Reporting completion charges: {self.completion_tokens} tokens")
@@ -1,19 +1,32 @@
+import os
 import sys
 import logging
 from pathlib import Path
+from contextlib import asynccontextmanager
 import json
-from typing import Dict
+from typing import Dict, List
 
+from .models.batch import BatchCompletion, BatchItem
 from .models.completion import Completion
 from .models.error import Error
 from .models.prompt import Prompt
+from .controllers.disconnect import ClientDisconnected, cancel_on_disconnect
+from .controllers.batch import run_batch
+from .controllers.cache import CompletionCache
+from .controllers.context import ContextBuckets
+from .controllers.fallback import FallbackPolicy
 from .controllers.inference import Inference
+from .controllers.residency import ResidencyManager
+from .controllers.scheduler import QueueFull, Scheduler
+from .controllers.semantic_cache import SemanticCache
+from .controllers.streaming import ndjson_stream
 from .models.model import ModelsResponse
-from .tools.tools import TOOLS, ToolCallBody
+from .tools.tools import TOOLS, ToolCallBody, run_tool
+from ..logs import Payload, setup_logging
 
-import ollama
 from datetime import datetime
-from fastapi import Body, FastAPI, HTTPException
+from fastapi import Body, FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse, UJSONResponse
 from dotenv import load_dotenv
 
 from langchain.prompts import PromptTemplate
@@ -31,17 +44,53 @@ import openai
 root_path = Path(__file__).resolve().parent.parent
 sys.path.append(str(root_path))
 
-logging.basicConfig(level=logging.DEBUG)
+setup_logging("tools")
 logger = logging.getLogger(__name__)
 
 
+inference = Inference(
+    cache=CompletionCache.from_env(),
+    scheduler=Scheduler.from_env(),
+    context=ContextBuckets.from_env(),
+    fallback=FallbackPolicy.from_env(),
+)
+# The embedder of the semantic cache uses the Ollama client of `inference`
+inference.semantic_cache = SemanticCache.from_env(inference)
+inference.residency = ResidencyManager.from_env(inference)
+
+# How many prompts of a batch run at the same time per model, and how many
+# prompts a batch may have
+PREDICT_BATCH_CONCURRENCY = int(os.getenv("PREDICT_BATCH_CONCURRENCY", "4"))
+PREDICT_BATCH_MAX_SIZE = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "256"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await inference.start()
+    await inference.residency.start()
+    try:
+        yield
+    finally:
+        await inference.residency.close()
+        await inference.close()
+
+
 app = FastAPI(
     title="Talus Model Integration API",
     description="Talus Utility for integrating Models trough API",
     version="6.0.2",
+    lifespan=lifespan,
 )
 
-inference = Inference()
+
+@app.exception_handler(QueueFull)
+async def queue_full_handler(request: Request, exc: QueueFull) -> JSONResponse:
+    logger.warning("Rejected request: %s", exc)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after_s)},
+    )
 
 
 @app.post(
@@ -55,6 +104,10 @@ inference = Inference()
             "model": Error,
             "description": "The request body contains invalid parameters.",
         },
+        503: {
+            "model": Error,
+            "description": "Too many requests are queued for the model, retry after `Retry-After` seconds.",
+        },
         500: {
             "model": Error,
             "description": "An unexpected error occurred while the server was processing the request.",
@@ -63,25 +116,152 @@ inference = Inference()
     tags=["default"],
     summary="Get a completion response from the AI model based on the provided prompt and parameters.",
     response_model_by_alias=True,
+    response_model_exclude_none=True,
+    response_class=UJSONResponse,
 )
 async def predict(
-    prompt_data: Prompt = Body(..., description="The input data for the AI model.")
+    request: Request,
+    prompt_data: Prompt = Body(..., description="The input data for the AI model."),
 ) -> Completion:
     """
-    This endpoint processes the input prompt with specified parameters and returns the AI-generated completion.
+    This endpoint processes the input prompt with specified parameters and returns the AI-generated completion
+    with its token counts and timings. The response of the backend is only included with `raw`.
+    If the client disconnects before the completion is ready, generation is cancelled.
+    """
+    logger.debug(
+        "predict with model %s: %s", prompt_data.model, Payload(prompt_data.prompt)
+    )
+
+    try:
+        completion = await cancel_on_disconnect(
+            request,
+            inference.prompt(
+                prompt=prompt_data.prompt,
+                model=prompt_data.model,
+                max_tokens=prompt_data.max_tokens,
+                temperature=prompt_data.temperature,
+                prefix_key=prompt_data.prefix_key,
+                allow_fallback=prompt_data.allow_fallback,
+                coalesce=prompt_data.coalesce,
+            ),
+        )
+    except ClientDisconnected:
+        logger.info("Client disconnected, cancelled prediction")
+        return Response(status_code=499)
+    logger.debug("completion: %s", Payload(completion), extra={"sample": "completion"})
+
+    return Completion.from_response(completion, raw=prompt_data.raw)
+
+
+@app.post(
+    "/predict/stream",
+    responses={
+        200: {
+            "content": {"application/x-ndjson": {}},
+            "description": "Newline delimited JSON records: a `token` record per generated piece of text, "
+            "then a `done` record with token counts and timings, or an `error` record.",
+        },
+        400: {
+            "model": Error,
+            "description": "The request body contains invalid parameters.",
+        },
+    },
+    tags=["default"],
+    summary="Stream a completion from the AI model as it is generated.",
+)
+async def predict_stream(
+    prompt_data: Prompt = Body(..., description="The input data for the AI model.")
+) -> StreamingResponse:
+    """
+    Like /predict, but forwards tokens as Ollama generates them so that callers can start working on the
+    completion before it is finished. The final record reports the time to first token.
+    Generation is cancelled if the client disconnects.
     """
-    print("start... predict")
-    print(f"prompt_data: {prompt_data}")
+    logger.debug(
+        "predict stream with model %s: %s",
+        prompt_data.model,
+        Payload(prompt_data.prompt),
+    )
 
-    completion = inference.prompt(
+    # Rejections are raised here, before the stream starts with a 200
+    chunks = inference.stream(
         prompt=prompt_data.prompt,
         model=prompt_data.model,
         max_tokens=prompt_data.max_tokens,
         temperature=prompt_data.temperature,
+        prefix_key=prompt_data.prefix_key,
+        allow_fallback=prompt_data.allow_fallback,
     )
-    print(f"completion: {completion}")
+    return StreamingResponse(ndjson_stream(chunks), media_type="application/x-ndjson")
+
+
+@app.post(
+    "/predict/batch",
+    responses={
+        200: {
+            "model": BatchCompletion,
+            "description": "A completion or an error for each prompt, in the order of the prompts.",
+        },
+        400: {
+            "model": Error,
+            "description": "The request body contains invalid parameters or too many prompts.",
+        },
+    },
+    tags=["default"],
+    summary="Get completions for a list of prompts in one request.",
+    response_model_by_alias=True,
+    response_model_exclude_none=True,
+    response_class=UJSONResponse,
+)
+async def predict_batch(
+    request: Request,
+    prompts: List[Prompt] = Body(..., description="The prompts to complete."),
+) -> BatchCompletion:
+    """
+    Runs the prompts concurrently, at most PREDICT_BATCH_CONCURRENCY at a time for each model.
+    A failing prompt is reported in its own result and does not fail the others.
+    """
+    if len(prompts) > PREDICT_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch can have at most {PREDICT_BATCH_MAX_SIZE} prompts",
+        )
+    logger.info("predict batch of %d prompts", len(prompts))
+
+    async def predict_one(prompt_data: Prompt) -> Completion:
+        completion = await inference.prompt(
+            prompt=prompt_data.prompt,
+            model=prompt_data.model,
+            max_tokens=prompt_data.max_tokens,
+            temperature=prompt_data.temperature,
+            prefix_key=prompt_data.prefix_key,
+            allow_fallback=prompt_data.allow_fallback,
+            coalesce=prompt_data.coalesce,
+        )
+        return Completion.from_response(completion, raw=prompt_data.raw)
 
-    return Completion(completion=json.dumps(completion), timestamp=datetime.now())
+    try:
+        outcomes = await cancel_on_disconnect(
+            request,
+            run_batch(
+                prompts,
+                lambda prompt_data: prompt_data.model,
+                predict_one,
+                PREDICT_BATCH_CONCURRENCY,
+            ),
+        )
+    except ClientDisconnected:
+        logger.info("Client disconnected, cancelled batch")
+        return Response(status_code=499)
+
+    results = []
+    for completion, error in outcomes:
+        if error is not None:
+            logger.warning("Prompt of batch failed: %s", error)
+            results.append(BatchItem(error=str(error)))
+        else:
+            results.append(BatchItem(completion=completion))
+    return BatchCompletion(results=results)
 
 
 @app.post(
@@ -107,22 +287,24 @@ async def use_tool(tool_call_body: ToolCallBody) -> Dict[str, str]:
     Supported tools are in TOOLS
     """
 
-    print(f"use tool called with: {tool_call_body}")
+    logger.info("use tool called with: %s", Payload(tool_call_body))
     if tool_call_body.tool_name not in TOOLS:
         raise HTTPException(
             status_code=400, detail=f"Unknown tool: {tool_call_body.tool_name}"
         )
 
     try:
-        tool = TOOLS[tool_call_body.tool_name]
-        result = tool._run(**tool_call_body.args.dict())
-        print(f"tool result: {result}")
+        result = run_tool(tool_call_body.tool_name, tool_call_body.args.dict())
+        logger.debug(
+            "tool result: %s", Payload(result), extra={"sample": "tool_result"}
+        )
         return {"result": result}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except openai.OpenAIError as e:
         raise HTTPException(status_code=500, detail=f"OpenAI API error: {str(e)}")
     except Exception as e:
+        logger.exception("Error using tool %s", tool_call_body.tool_name)
         raise HTTPException(
             status_code=500, detail="An error occurred while using the tool"
         )
@@ -159,8 +341,8 @@ async def prompt_tools(prompt_data: Prompt = Body(...)):
     wrapped_tools = {name: wrap_clusterai_tool(tool) for name, tool in TOOLS.items()}
 
     try:
-        print(f"Received prompt: {prompt_data.prompt}")
-        print(f"Selected tools: {prompt_data.tools}")
+        logger.debug("Received prompt: %s", Payload(prompt_data.prompt))
+        logger.debug("Selected tools: %s", prompt_data.tools)
 
         llm = OllamaFunctions(
             model=prompt_data.model,
@@ -168,7 +350,7 @@ async def prompt_tools(prompt_data: Prompt = Body(...)):
             callback_manager=CallbackManager([StreamingStdOutCallbackHandler()]),
             format="json",
         )
-        print("OllamaFunctions initialized")
+        logger.debug("OllamaFunctions initialized")
 
         selected_tools = []
         for tool_name in prompt_data.tools:
@@ -187,25 +369,25 @@ async def prompt_tools(prompt_data: Prompt = Body(...)):
                         },
                     }
                 )
-                print(f"Added tool: {tool.name}")
+                logger.debug("Added tool: %s", tool.name)
             else:
                 raise ValueError(f"Unknown tool: {tool_name}")
 
         llm_with_tools = llm.bind_tools(selected_tools)
-        print("Tools bound to LLM")
+        logger.debug("Tools bound to LLM")
 
         prompt_template = PromptTemplate(
             input_variables=["input"],
             template="Answer the following question, using the provided tools if necessary. Always use a tool before answering: {input}",
         )
-        print("Prompt template created")
+        logger.debug("Prompt template created")
 
         chain = {"input": RunnablePassthrough()} | prompt_template | llm_with_tools
-        print("RunnableSequence created")
+        logger.debug("RunnableSequence created")
 
-        print("Invoking the chain")
+        logger.debug("Invoking the chain")
         result = chain.invoke(prompt_data.prompt)
-        print(f"Chain result: {result}")
+        logger.debug("Chain result: %s", Payload(result))
 
         # Process the result
         if isinstance(result, str):
@@ -214,20 +396,24 @@ async def prompt_tools(prompt_data: Prompt = Body(...)):
                 if "tool" in result_json:
                     tool_name = result_json["tool"]
                     tool_input = result_json["tool_input"]
-                    print(f"Executing tool: {tool_name} with input: {tool_input}")
+                    logger.info(
+                        "Executing tool: %s with input: %s",
+                        tool_name,
+                        Payload(tool_input),
+                    )
                     tool_result = wrapped_tools[tool_name](**tool_input)
-                    print(f"Tool result: {tool_result}")
+                    logger.debug("Tool result: %s", Payload(tool_result))
                     final_result = f"Tool {tool_name} returned: {tool_result}"
                 else:
                     final_result = json.dumps(result_json)
             except Exception as e:
-                print(f"Error processing result: {e}")
+                logger.warning("Error processing result: %s", e)
                 final_result = f"Error processing result: {result}"
         else:
             final_result = str(result)
 
         if not final_result:
-            print("Chain returned an empty result")
+            logger.warning("Chain returned an empty result")
             return Completion(
                 completion="The model did not generate any output. Please try again.",
                 timestamp=datetime.now(),
@@ -236,7 +422,7 @@ async def prompt_tools(prompt_data: Prompt = Body(...)):
         return Completion(completion=final_result, timestamp=datetime.now())
 
     except Exception as e:
-        print(f"An error occurred in prompt_tools: {e}")
+        logger.exception("An error occurred in prompt_tools: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -251,8 +437,96 @@ def execute_tool_call(tool_call):
     return tool._run(**args)
 
 
-@app.get("/models", response_model=ModelsResponse)
+@app.get("/cache/stats")
+async def get_cache_stats() -> Dict[str, object]:
+    """Hit and miss counters of the exact and the semantic completion cache,
+    and how many requests shared the completion of an identical one in flight.
+
+    A cache that is disabled has no entry.
+    """
+    stats = {}
+    if inference.cache is not None:
+        stats["exact"] = inference.cache.stats()
+    if inference.semantic_cache is not None:
+        stats["semantic"] = inference.semantic_cache.stats()
+    stats["singleflight"] = inference.singleflight.stats()
+    return stats
+
+
+@app.get("/metrics")
+async def get_metrics() -> Dict[str, object]:
+    """Tokens, throughput and histograms of load and prompt evaluation times per model."""
+    return inference.usage.stats()
+
+
+@app.get("/scheduler/stats")
+async def get_scheduler_stats() -> Dict[str, object]:
+    """Running and queued requests, wait and service times per model."""
+    return inference.scheduler.stats()
+
+
+@app.get("/models/residency")
+async def get_model_residency() -> Dict[str, object]:
+    """Which models Ollama has loaded, which are pinned and how much they are used."""
+    try:
+        return await inference.residency.state()
+    except Exception as e:
+        raise HTTPException(
+            status_code=502, detail=f"Cannot get residency from Ollama: {e}"
+        )
+
+
+@app.get("/models/context")
+async def get_model_context() -> Dict[str, object]:
+    """The context size each model is loaded with, reloads and requests per size."""
+    return inference.context.stats()
+
+
+@app.get("/models/fallbacks")
+async def get_model_fallbacks() -> Dict[str, dict]:
+    """Fallback chains, how long each model has been overloaded and the requests sent to its fallbacks."""
+    return inference.fallback.stats()
+
+
+@app.get("/models/prefixes")
+async def get_model_prefixes() -> Dict[str, object]:
+    """Requests with a shared prompt prefix and the prompt tokens that saved."""
+    return inference.prefixes.stats()
+
+
+@app.get("/backends")
+async def get_backends() -> Dict[str, object]:
+    """Health, loaded models, load and latency of each inference host."""
+    return inference.pool.stats()
+
+
+@app.get("/models", response_model=ModelsResponse, response_model_exclude_none=True)
 async def get_models() -> ModelsResponse:
-    models_res = ollama.list()
-    print(models_res["models"])
-    return ModelsResponse(models=models_res["models"])
+    models = await inference.list_models()
+    logger.debug("models: %s", Payload(models))
+    return ModelsResponse(models=models)
+
+
+def main():
+    """Runs the server on the Unix socket TOOLS_UDS if set, otherwise over TCP.
+
+    Listeners on the same host should prefer the socket, e.g.
+    `LLM_ASSISTANT_URL=unix:///run/nexus/tools.sock:/predict`.
+    """
+    import uvicorn
+
+    # Keep uvicorn's access and error logs on the queue set up above
+    uds = os.getenv("TOOLS_UDS")
+    if uds:
+        uvicorn.run(app, uds=uds, log_config=None)
+    else:
+        uvicorn.run(
+            app,
+            host=os.getenv("TOOLS_HOST", "0.0.0.0"),
+            port=int(os.getenv("TOOLS_PORT", "8080")),
+            log_config=None,
+        )
+
+
+if __name__ == "__main__":
+    main()
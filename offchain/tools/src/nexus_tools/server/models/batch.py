@@ -0,0 +1,24 @@
+# coding: utf-8
+
+from __future__ import annotations
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+from .completion import Completion
+
+
+class BatchItem(BaseModel):
+    """Outcome of one prompt of a batch, either a completion or an error."""
+
+    completion: Optional[Completion] = Field(alias="completion", default=None)
+    error: Optional[str] = Field(alias="error", default=None)
+
+
+class BatchCompletion(BaseModel):
+    """Outcomes of a batch of prompts, in the order of the prompts."""
+
+    results: List[BatchItem] = Field(alias="results")
+
+
+BatchItem.update_forward_refs()
+BatchCompletion.update_forward_refs()
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -20,11 +20,52 @@ class Completion(BaseModel):
 
         completion: The completion of this Completion.
         timestamp: The timestamp of this Completion.
+        model: The model of this Completion [Optional].
+        fallback_from: The fallback_from of this Completion [Optional].
+        done_reason: The done_reason of this Completion [Optional].
+        prompt_eval_count: The prompt_eval_count of this Completion [Optional].
+        eval_count: The eval_count of this Completion [Optional].
+        total_duration: The total_duration of this Completion [Optional].
+        load_duration: The load_duration of this Completion [Optional].
+        prompt_eval_duration: The prompt_eval_duration of this Completion [Optional].
+        eval_duration: The eval_duration of this Completion [Optional].
+        raw: The raw of this Completion [Optional].
     """
 
     completion: str = Field(alias="completion")
     timestamp: datetime = Field(alias="timestamp")
     tool_calls: Optional[List[ToolCall]] = None
+    model: Optional[str] = None
+    fallback_from: Optional[str] = None
+    done_reason: Optional[str] = None
+    prompt_eval_count: Optional[int] = None
+    eval_count: Optional[int] = None
+    # Durations are in nanoseconds, as reported by Ollama
+    total_duration: Optional[int] = None
+    load_duration: Optional[int] = None
+    prompt_eval_duration: Optional[int] = None
+    eval_duration: Optional[int] = None
+    raw: Optional[Dict[str, Any]] = Field(
+        default=None, description="The response of the backend as is, if requested"
+    )
+
+    @classmethod
+    def from_response(cls, response: dict, raw: bool = False) -> "Completion":
+        """The completion of an Ollama chat response."""
+        return cls(
+            completion=response["message"]["content"],
+            timestamp=datetime.now(),
+            model=response.get("model"),
+            fallback_from=response.get("fallback_from"),
+            done_reason=response.get("done_reason"),
+            prompt_eval_count=response.get("prompt_eval_count"),
+            eval_count=response.get("eval_count"),
+            total_duration=response.get("total_duration"),
+            load_duration=response.get("load_duration"),
+            prompt_eval_duration=response.get("prompt_eval_duration"),
+            eval_duration=response.get("eval_duration"),
+            raw=response if raw else None,
+        )
 
 
 Completion.update_forward_refs()
@@ -12,11 +12,12 @@ class ModelDetail(BaseModel):
 
 
 class Model(BaseModel):
+    # Only Ollama hosts report more than the name
     name: str
-    modified_at: datetime
-    size: int
-    digest: str
-    details: ModelDetail
+    modified_at: Optional[datetime] = None
+    size: Optional[int] = None
+    digest: Optional[str] = None
+    details: Optional[ModelDetail] = None
 
 
 class ModelsResponse(BaseModel):
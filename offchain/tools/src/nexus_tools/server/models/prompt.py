@@ -17,6 +17,10 @@ class Prompt(BaseModel):
         model: The model of this Prompt.
         max_tokens: The max_tokens of this Prompt.
         temperature: The temperature of this Prompt.
+        prefix_key: The prefix_key of this Prompt [Optional].
+        allow_fallback: The allow_fallback of this Prompt [Optional].
+        coalesce: The coalesce of this Prompt [Optional].
+        raw: The raw of this Prompt [Optional].
     """
 
     prompt: str = Field(alias="prompt")
@@ -26,6 +30,22 @@ class Prompt(BaseModel):
     tools: Optional[List[str]] = Field(
         default=None, description="List of tool names to be used"
     )
+    prefix_key: Optional[str] = Field(
+        default=None,
+        description="Groups prompts that share a prefix, e.g. the cluster execution they belong to",
+    )
+    allow_fallback: bool = Field(
+        default=False,
+        description="Whether a smaller model may answer while the requested one is overloaded",
+    )
+    coalesce: bool = Field(
+        default=False,
+        description="Whether identical requests in flight may share one completion at a temperature above 0",
+    )
+    raw: bool = Field(
+        default=False,
+        description="Whether to include the response of the backend as is",
+    )
 
     @validator("temperature")
     def temperature_max(cls, value):
@@ -0,0 +1,98 @@
+"""
+Static description of the tools in tools.py: their names, descriptions and
+the order, types and requiredness of their arguments.
+
+Importing tools.py loads langchain, openai, google.generativeai, crewai_tools
+and unstructured. Processes that only need to check tool names and bind
+positional args, like the event listener, load manifest.json instead, which
+is regenerated from tools.py with:
+
+    python -m nexus_tools.server.tools.manifest
+
+This module must not import tools.py at module level.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+MANIFEST_PATH = Path(__file__).resolve().parent / "manifest.json"
+
+# JSON schema types of tool arguments to the Python types we accept for them
+ARG_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+}
+
+
+def build_manifest() -> Dict[str, Any]:
+    """Builds the manifest from TOOLS and TOOL_ARGS_MAPPING, importing all tools."""
+    from .tools import TOOL_ARGS_MAPPING, TOOLS
+
+    tools = {}
+    for name, args_class in TOOL_ARGS_MAPPING.items():
+        if name not in TOOLS:
+            continue
+        schema = args_class.schema()
+        required = set(schema.get("required", []))
+        tools[name] = {
+            "description": TOOLS[name].description,
+            "args": [
+                {
+                    "name": field,
+                    "type": schema["properties"][field].get("type", "string"),
+                    "required": field in required,
+                    "description": schema["properties"][field].get("description", ""),
+                }
+                for field in args_class.__fields__.keys()
+            ],
+        }
+    return {"tools": tools}
+
+
+def load_manifest(path: Path = MANIFEST_PATH) -> Dict[str, Any]:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def bind_args(manifest: Dict[str, Any], tool_name: str, args: List[Any]) -> dict:
+    """Maps positional tool args, as stored onchain, to the tool's keyword args.
+
+    Raises ValueError if the tool is unknown, a required arg is missing or an
+    arg has the wrong type.
+    """
+    tool = manifest["tools"].get(tool_name)
+    if tool is None:
+        raise ValueError(f"Unknown tool: {tool_name}")
+
+    bound = {}
+    for spec, value in zip(tool["args"], args):
+        expected = ARG_TYPES.get(spec["type"], object)
+        if not isinstance(value, expected):
+            raise ValueError(
+                f"Argument '{spec['name']}' of tool '{tool_name}' must be of type {spec['type']}"
+            )
+        bound[spec["name"]] = value
+
+    missing = [
+        spec["name"]
+        for spec in tool["args"]
+        if spec["required"] and spec["name"] not in bound
+    ]
+    if missing:
+        raise ValueError(f"Missing arguments for tool '{tool_name}': {missing}")
+    return bound
+
+
+def main():
+    manifest = build_manifest()
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    print(f"Wrote {len(manifest['tools'])} tools to {MANIFEST_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -321,3 +321,17 @@ TOOLS = {
         lambda query: InstagramSearchTools.search_instagram(query),
     ),
 }
+
+
+def run_tool(tool_name: str, args: dict) -> Any:
+    """Runs a tool from TOOLS after validating `args` with its TOOL_ARGS_MAPPING model.
+
+    The model applies the defaults and coercions of the tool's args, so that
+    callers running tools in-process get the same results as /tool/use. This
+    is a module level function so that it can be submitted to a process pool.
+    Raises ValueError if the tool is unknown or the args are invalid.
+    """
+    if tool_name not in TOOLS:
+        raise ValueError(f"Unknown tool: {tool_name}")
+    validated = TOOL_ARGS_MAPPING[tool_name](**args)
+    return TOOLS[tool_name]._run(**validated.dict())
@@ -0,0 +1,112 @@
+"""
+tests for the inference backends in controllers/backends.py
+To run, execute "PYTHONPATH=src pytest tests/test_backends.py" from `tools` directory
+"""
+
+import asyncio
+import json
+
+import httpx
+
+from nexus_tools.server.controllers.backends import (
+    OllamaBackend,
+    OpenAICompatibleBackend,
+    StubBackend,
+    create_backend,
+)
+from nexus_tools.server.controllers.inference import Inference
+from nexus_tools.server.controllers.pool import BackendPool, Host
+
+MESSAGES = [{"role": "user", "content": "What is the capital of France?"}]
+
+
+def test_create_backend_by_scheme():
+    assert isinstance(create_backend("stub://"), StubBackend)
+    assert isinstance(
+        create_backend("openai+http://vllm:8000"), OpenAICompatibleBackend
+    )
+    assert isinstance(create_backend("http://localhost:11434"), OllamaBackend)
+
+
+def test_stub_is_deterministic():
+    async def run():
+        backend = StubBackend()
+        first = await backend.chat("llama3", MESSAGES)
+        second = await backend.chat("llama3", MESSAGES)
+        chunks = [c async for c in await backend.chat_stream("llama3", MESSAGES)]
+        return first, second, chunks, await backend.list()
+
+    first, second, chunks, listing = asyncio.run(run())
+    assert first["message"]["content"] == second["message"]["content"]
+    assert first["done"] and first["eval_count"] == 4
+    assert (
+        "".join(c["message"]["content"] for c in chunks) == first["message"]["content"]
+    )
+    assert listing["models"][0]["model"] == "llama3"
+
+
+def test_ollama_close_closes_its_connections():
+    backend = OllamaBackend("http://localhost:11434")
+    asyncio.run(backend.close())
+    assert backend.client._client.is_closed
+
+
+def test_inference_over_stub_host():
+    inference = Inference(pool=BackendPool([Host("stub://")]))
+
+    async def run():
+        response = await inference.prompt("Hello", "llama3", temperature=0)
+        models = await inference.list_models()
+        await inference.close()
+        return response, models
+
+    response, models = asyncio.run(run())
+    assert response["message"]["content"].startswith("stub-")
+    assert [model["name"] for model in models] == ["llama3"]
+
+
+def openai_backend():
+    def handler(request):
+        body = json.loads(request.content)
+        usage = {"prompt_tokens": 7, "completion_tokens": 2}
+        if not body.get("stream"):
+            return httpx.Response(
+                200,
+                json={
+                    "choices": [
+                        {
+                            "message": {"content": "Paris."},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": usage,
+                },
+            )
+        events = [
+            {"choices": [{"delta": {"content": "Par"}}]},
+            {"choices": [{"delta": {"content": "is."}, "finish_reason": "stop"}]},
+            {"choices": [], "usage": usage},
+        ]
+        lines = [f"data: {json.dumps(event)}\n\n" for event in events]
+        return httpx.Response(200, text="".join(lines) + "data: [DONE]\n\n")
+
+    return OpenAICompatibleBackend(
+        "http://vllm:8000", transport=httpx.MockTransport(handler)
+    )
+
+
+def test_openai_compatible_answers_in_ollama_shape():
+    async def run():
+        backend = openai_backend()
+        response = await backend.chat("llama3", MESSAGES, {"num_predict": 10})
+        chunks = [c async for c in await backend.chat_stream("llama3", MESSAGES)]
+        await backend.close()
+        return response, chunks
+
+    response, chunks = asyncio.run(run())
+    assert response["message"]["content"] == "Paris."
+    assert response["prompt_eval_count"] == 7
+    assert response["eval_count"] == 2
+    assert [c["message"]["content"] for c in chunks] == ["Par", "is.", ""]
+    assert chunks[-1]["done"] and chunks[-1]["done_reason"] == "stop"
+    assert chunks[-1]["eval_count"] == 2
@@ -0,0 +1,39 @@
+"""
+tests for the fan-out of /predict/batch in controllers/batch.py
+To run, execute "PYTHONPATH=src pytest tests/test_batch.py" from `tools` directory
+"""
+
+import asyncio
+
+from nexus_tools.server.controllers.batch import run_batch
+
+
+def test_results_in_order_with_errors():
+    async def run(item):
+        model, n = item
+        await asyncio.sleep(0.01 * (3 - n))
+        if n == 1:
+            raise ValueError("model failed")
+        return n
+
+    outcomes = asyncio.run(
+        run_batch([("a", 0), ("a", 1), ("b", 2)], lambda item: item[0], run, 2)
+    )
+    assert outcomes[0] == (0, None)
+    assert outcomes[1][0] is None
+    assert isinstance(outcomes[1][1], ValueError)
+    assert outcomes[2] == (2, None)
+
+
+def test_concurrency_capped_per_model():
+    running = {"a": 0, "b": 0}
+    peak = {"a": 0, "b": 0}
+
+    async def run(model):
+        running[model] += 1
+        peak[model] = max(peak[model], running[model])
+        await asyncio.sleep(0.01)
+        running[model] -= 1
+
+    asyncio.run(run_batch(["a"] * 6 + ["b"] * 6, lambda model: model, run, 2))
+    assert peak == {"a": 2, "b": 2}
@@ -0,0 +1,99 @@
+"""
+tests for the completion cache in controllers/cache.py
+To run, execute "PYTHONPATH=src pytest tests/test_cache.py" from `tools` directory
+"""
+
+import asyncio
+
+from nexus_tools.server.controllers.cache import CompletionCache
+
+COMPLETION = {"message": {"role": "assistant", "content": "Paris"}, "done": True}
+
+
+def test_key_depends_on_digest_and_options():
+    key = CompletionCache.key("llama3", "sha256:a", "capital?", {"temperature": 0})
+    assert key == CompletionCache.key(
+        "llama3", "sha256:a", "capital?", {"temperature": 0}
+    )
+    assert key != CompletionCache.key(
+        "llama3", "sha256:b", "capital?", {"temperature": 0}
+    )
+    assert key != CompletionCache.key(
+        "llama3", "sha256:a", "capital?", {"temperature": 0, "num_predict": 5}
+    )
+
+
+def test_hit_and_miss():
+    async def run():
+        cache = CompletionCache()
+        assert await cache.get("k") is None
+        await cache.put("k", COMPLETION)
+        assert await cache.get("k") == COMPLETION
+        return cache.stats()
+
+    stats = asyncio.run(run())
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_evicts_least_recently_used():
+    async def run():
+        size = len('{"n": 0}')
+        cache = CompletionCache(max_bytes=2 * size)
+        await cache.put("a", {"n": 0})
+        await cache.put("b", {"n": 1})
+        await cache.get("a")
+        await cache.put("c", {"n": 2})
+        return [await cache.get(key) for key in "abc"], cache.stats()
+
+    found, stats = asyncio.run(run())
+    assert found == [{"n": 0}, None, {"n": 2}]
+    assert stats["evictions"] == 1
+
+
+def test_expired_entries_are_not_served(tmp_path):
+    async def run():
+        cache = CompletionCache(ttl_s=0, disk_dir=str(tmp_path))
+        await cache.put("k", COMPLETION)
+        return await cache.get("k")
+
+    assert asyncio.run(run()) is None
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    async def run():
+        await CompletionCache(disk_dir=str(tmp_path)).put("k", COMPLETION)
+        cache = CompletionCache(disk_dir=str(tmp_path))
+        return await cache.get("k"), cache.stats()
+
+    found, stats = asyncio.run(run())
+    assert found == COMPLETION
+    assert stats["disk_hits"] == 1
+
+
+def test_unwritable_disk_keeps_memory_entry(tmp_path):
+    disk_dir = tmp_path / "not_a_dir"
+    disk_dir.write_text("")
+
+    async def run():
+        cache = CompletionCache(disk_dir=str(disk_dir))
+        await cache.put("k", COMPLETION)
+        return await cache.get("k"), cache.stats()
+
+    found, stats = asyncio.run(run())
+    assert found == COMPLETION
+    assert stats["hits"] == 1
+    assert stats["disk_hits"] == 0
+
+
+def test_corrupt_disk_entry_is_a_miss(tmp_path):
+    (tmp_path / "k.json").write_text('{"completion": ')
+
+    async def run():
+        cache = CompletionCache(disk_dir=str(tmp_path))
+        return await cache.get("k"), cache.stats()
+
+    found, stats = asyncio.run(run())
+    assert found is None
+    assert stats["misses"] == 1
+    assert not (tmp_path / "k.json").exists()
@@ -0,0 +1,36 @@
+"""
+tests for building the /predict response in models/completion.py
+To run, execute "PYTHONPATH=src pytest tests/test_completion.py" from `tools` directory
+"""
+
+from nexus_tools.server.models.completion import Completion
+
+RESPONSE = {
+    "model": "llama3.2:1b",
+    "created_at": "2024-01-01T00:00:00Z",
+    "message": {"role": "assistant", "content": "Paris."},
+    "done": True,
+    "done_reason": "stop",
+    "prompt_eval_count": 12,
+    "eval_count": 3,
+    "total_duration": 5_000_000,
+    "load_duration": 1_000_000,
+    "prompt_eval_duration": 2_000_000,
+    "eval_duration": 2_000_000,
+}
+
+
+def test_content_counts_and_timings_are_fields():
+    completion = Completion.from_response(RESPONSE)
+    body = completion.dict(exclude_none=True)
+    assert body["completion"] == "Paris."
+    assert body["model"] == "llama3.2:1b"
+    assert body["prompt_eval_count"] == 12
+    assert body["eval_duration"] == 2_000_000
+    assert "raw" not in body
+    assert "fallback_from" not in body
+
+
+def test_raw_response_only_on_request():
+    completion = Completion.from_response(RESPONSE, raw=True)
+    assert completion.raw == RESPONSE
@@ -0,0 +1,47 @@
+"""
+tests for the num_ctx buckets in controllers/context.py
+To run, execute "PYTHONPATH=src pytest tests/test_context.py" from `tools` directory
+"""
+
+from nexus_tools.server.controllers.context import ContextBuckets
+
+HOST = "http://ollama:11434"
+
+
+def test_smallest_fitting_bucket():
+    buckets = ContextBuckets([2048, 8192])
+    assert buckets.num_ctx(HOST, "a", "short prompt", 1000) == 2048
+    buckets.forget(HOST, "a")
+    assert buckets.num_ctx(HOST, "a", "x" * 9000, 1000) == 8192
+
+
+def test_reuses_larger_loaded_context_and_counts_reloads():
+    buckets = ContextBuckets([2048, 8192])
+    assert buckets.num_ctx(HOST, "a", "short prompt", 100) == 2048
+    assert buckets.num_ctx(HOST, "a", "x" * 9000, 1000) == 8192
+    # A short prompt does not shrink the loaded instance again
+    assert buckets.num_ctx(HOST, "a", "short prompt", 100) == 8192
+    stats = buckets.stats()["a"]
+    assert stats["reloads"] == 1
+    assert stats["loaded_num_ctx"] == {HOST: 8192}
+
+
+def test_per_model_buckets_and_overflow():
+    buckets = ContextBuckets([2048], {"big": [4096, 32768]})
+    assert buckets.num_ctx(HOST, "big", "short prompt", 100) == 4096
+    assert buckets.num_ctx(HOST, "small", "x" * 9000, 100) == 2048
+    assert buckets.stats()["small"]["overflows"] == 1
+
+
+def test_each_host_keeps_its_own_context():
+    buckets = ContextBuckets([2048, 8192])
+    assert buckets.num_ctx("a", "m", "x" * 9000, 1000) == 8192
+    # The instance on the other host is not grown by the first one
+    assert buckets.num_ctx("b", "m", "short prompt", 100) == 2048
+    assert buckets.num_ctx("b", "m", "x" * 9000, 1000) == 8192
+    buckets.forget("a", "m")
+    assert buckets.num_ctx("a", "m", "short prompt", 100) == 2048
+    assert buckets.num_ctx("b", "m", "short prompt", 100) == 8192
+    stats = buckets.stats()["m"]
+    assert stats["reloads"] == 1
+    assert stats["loaded_num_ctx"] == {"a": 2048, "b": 8192}
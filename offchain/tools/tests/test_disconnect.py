@@ -0,0 +1,54 @@
+"""
+tests for controllers/disconnect.py
+To run, execute "PYTHONPATH=src pytest tests/test_disconnect.py" from `tools` directory
+"""
+
+import asyncio
+
+import pytest
+
+from nexus_tools.server.controllers.disconnect import (
+    ClientDisconnected,
+    cancel_on_disconnect,
+)
+
+
+class FakeRequest:
+    def __init__(self, disconnect_after: float):
+        self.disconnect_after = disconnect_after
+
+    async def receive(self):
+        await asyncio.sleep(self.disconnect_after)
+        return {"type": "http.disconnect"}
+
+
+def test_returns_result_while_connected():
+    async def work():
+        await asyncio.sleep(0.01)
+        return "done"
+
+    result = asyncio.run(cancel_on_disconnect(FakeRequest(10), work()))
+    assert result == "done"
+
+
+def test_cancels_work_on_disconnect():
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    with pytest.raises(ClientDisconnected):
+        asyncio.run(cancel_on_disconnect(FakeRequest(0.01), work()))
+    assert cancelled == [True]
+
+
+def test_propagates_errors():
+    async def work():
+        raise ValueError("bad prompt")
+
+    with pytest.raises(ValueError):
+        asyncio.run(cancel_on_disconnect(FakeRequest(10), work()))
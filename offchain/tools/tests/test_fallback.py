@@ -0,0 +1,102 @@
+"""
+tests for the model fallback policy in controllers/fallback.py
+To run, execute "PYTHONPATH=src pytest tests/test_fallback.py" from `tools` directory
+"""
+
+import asyncio
+
+from nexus_tools.server.controllers.fallback import FallbackPolicy
+from nexus_tools.server.controllers.inference import Inference
+from nexus_tools.server.controllers.pool import BackendPool, Host
+from nexus_tools.server.controllers.scheduler import Scheduler
+
+CHAINS = {"big": ["medium", "small"]}
+
+
+async def overload(scheduler, model, queued):
+    """Holds every slot of `model` and queues `queued` more requests."""
+    release = asyncio.Event()
+
+    async def hold():
+        async with scheduler.slot(model):
+            await release.wait()
+
+    tasks = [
+        asyncio.create_task(hold()) for _ in range(scheduler.model_concurrency + queued)
+    ]
+    await asyncio.sleep(0)
+    return release, tasks
+
+
+def test_idle_model_is_not_replaced():
+    policy = FallbackPolicy(CHAINS, wait_slo_s=1, sustain_s=0)
+    assert policy.choose("big", Scheduler()) == "big"
+    assert policy.choose("other", Scheduler()) == "other"
+
+
+def test_sustained_overload_falls_back_to_first_fast_enough_model():
+    async def run():
+        scheduler = Scheduler(capacity=8, model_concurrency=1)
+        release, tasks = await overload(scheduler, "big", 4)
+        scheduler._queues["big"].service_time_s = 10.0
+        release_medium, medium_tasks = await overload(scheduler, "medium", 4)
+        scheduler._queues["medium"].service_time_s = 10.0
+
+        patient = FallbackPolicy(CHAINS, wait_slo_s=1, sustain_s=60)
+        eager = FallbackPolicy(CHAINS, wait_slo_s=1, sustain_s=0)
+        chosen = patient.choose("big", scheduler), eager.choose("big", scheduler)
+
+        release.set()
+        release_medium.set()
+        await asyncio.gather(*tasks, *medium_tasks)
+        return chosen, eager.stats()
+
+    (patient, eager), stats = asyncio.run(run())
+    assert patient == "big"
+    assert eager == "small"
+    assert stats["big"]["overloaded_for_s"] is not None
+
+
+def test_response_records_the_model_used():
+    inference = Inference(
+        pool=BackendPool([Host("stub://")]),
+        fallback=FallbackPolicy(CHAINS, wait_slo_s=1, sustain_s=0),
+    )
+    inference.fallback.choose = lambda model, scheduler: "small"
+
+    async def run():
+        allowed = await inference.prompt("Hello", "big", allow_fallback=True)
+        refused = await inference.prompt("Hello", "big")
+        await inference.close()
+        return allowed, refused
+
+    allowed, refused = asyncio.run(run())
+    assert allowed["model"] == "small"
+    assert allowed["fallback_from"] == "big"
+    assert refused["model"] == "big"
+    assert "fallback_from" not in refused
+    assert inference.fallback.stats()["big"]["requests_by_fallback"] == {"small": 1}
+
+
+def test_stream_chooses_and_admits_the_model_once():
+    inference = Inference(
+        pool=BackendPool([Host("stub://")]),
+        fallback=FallbackPolicy(CHAINS, wait_slo_s=1, sustain_s=0),
+    )
+    choices, admitted = [], []
+    inference.fallback.choose = (
+        lambda model, scheduler: choices.append(model) or "small"
+    )
+    inference.scheduler.admit = admitted.append
+
+    async def run():
+        chunks = inference.stream("Hello", "big", allow_fallback=True)
+        last = [chunk async for chunk in chunks][-1]
+        await inference.close()
+        return last
+
+    last = asyncio.run(run())
+    assert choices == ["big"]
+    assert admitted == ["small"]
+    assert last["model"] == "small"
+    assert last["fallback_from"] == "big"
@@ -0,0 +1,65 @@
+"""
+tests for the lifecycle of the long-lived Inference in controllers/inference.py
+To run, execute "PYTHONPATH=src pytest tests/test_inference.py" from `tools` directory
+"""
+
+import asyncio
+
+from nexus_tools.server.controllers import pool
+from nexus_tools.server.controllers.backends import OllamaBackend, create_backend
+from nexus_tools.server.controllers.inference import Inference
+from nexus_tools.server.controllers.pool import BackendPool, Host
+
+
+def test_clients_are_configured_from_env(monkeypatch):
+    monkeypatch.setenv("OLLAMA_CONNECT_TIMEOUT_S", "2")
+    monkeypatch.setenv("OLLAMA_TIMEOUT_S", "30")
+    monkeypatch.setenv("OLLAMA_MAX_CONNECTIONS", "8")
+    monkeypatch.setenv("OLLAMA_KEEPALIVE_EXPIRY_S", "15")
+    inference = Inference(host="http://ollama:11434")
+
+    async def run():
+        await inference.start()
+        backend = inference.pool.hosts[0].backend
+        client = backend.client._client
+        settings = (
+            str(client.base_url),
+            client.timeout.connect,
+            client.timeout.read,
+            client._transport._pool._max_connections,
+            client._transport._pool._keepalive_expiry,
+        )
+        await inference.close()
+        return backend, client, settings
+
+    backend, client, settings = asyncio.run(run())
+    assert isinstance(backend, OllamaBackend)
+    assert settings == ("http://ollama:11434", 2.0, 30.0, 8, 15.0)
+    assert client.is_closed
+    assert inference.pool.hosts[0].backend is None
+
+
+def test_one_client_serves_every_request(monkeypatch):
+    created = []
+
+    def counting_create_backend(url, **client_kwargs):
+        backend = create_backend(url, **client_kwargs)
+        created.append(backend)
+        return backend
+
+    monkeypatch.setattr(pool, "create_backend", counting_create_backend)
+    inference = Inference(pool=BackendPool([Host("stub://")]))
+
+    async def run():
+        await inference.start()
+        await inference.start()
+        for temperature in (0.1, 0.2, 0.3):
+            await inference.prompt("Hello", "llama3", temperature=temperature)
+        await inference.close()
+        # A closed Inference starts with a fresh client
+        await inference.prompt("Hello", "llama3", temperature=0.4)
+        await inference.close()
+
+    asyncio.run(run())
+    assert len(created) == 2
+    assert created[0].models == {"llama3"}
@@ -0,0 +1,123 @@
+"""
+tests for the logging setup in logs.py
+To run, execute "PYTHONPATH=src pytest tests/test_logs.py" from `tools` directory
+"""
+
+import json
+import logging
+
+import pytest
+
+from nexus_tools import logs
+from nexus_tools.logs import (
+    JsonFormatter,
+    NonBlockingQueueHandler,
+    Payload,
+    SamplingFilter,
+    setup_logging,
+)
+
+
+def record(msg="hello %s", args=("world",), **extra):
+    entry = logging.LogRecord("nexus.test", logging.INFO, __file__, 1, msg, args, None)
+    entry.__dict__.update(extra)
+    return entry
+
+
+@pytest.fixture
+def restore_logging(monkeypatch):
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    monkeypatch.setattr(Payload, "max_chars", Payload.max_chars)
+    yield
+    if logs._listener is not None:
+        logs._listener.stop()
+        logs._listener = None
+    root.handlers[:] = handlers
+    root.setLevel(level)
+    logging.getLogger("nexus.quiet").setLevel(logging.NOTSET)
+
+
+def test_short_payloads_are_kept(monkeypatch):
+    monkeypatch.setattr(Payload, "max_chars", 6)
+    assert str(Payload("hello!")) == "hello!"
+    assert str(Payload([1, 2])) == "[1, 2]"
+
+
+def test_long_payloads_are_truncated_and_hashed(monkeypatch):
+    monkeypatch.setattr(Payload, "max_chars", 5)
+    text = str(Payload("hello world"))
+    assert text.startswith("hello... [11 chars, sha256 ")
+    assert text == str(Payload("hello world"))
+    assert text != str(Payload("hello there"))
+
+
+def test_sampling_rates():
+    keep_none = SamplingFilter({"event": 0.0})
+    keep_all = SamplingFilter({"event": 1.0})
+    assert not any(keep_none.filter(record(sample="event")) for _ in range(100))
+    assert all(keep_all.filter(record(sample="event")) for _ in range(100))
+    assert keep_none.filter(record())
+    assert keep_none.filter(record(sample="other"))
+
+
+def test_json_output_shape():
+    entry = json.loads(
+        JsonFormatter("tools").format(
+            record(sample="event", request_id=7, payload=Payload("x"), tags=["a"])
+        )
+    )
+    assert set(entry) == {
+        "ts",
+        "level",
+        "service",
+        "logger",
+        "msg",
+        "request_id",
+        "payload",
+        "tags",
+    }
+    assert entry["msg"] == "hello world"
+    assert entry["service"] == "tools"
+    assert entry["request_id"] == 7
+    assert entry["payload"] == "x"
+    assert entry["tags"] == "['a']"
+
+
+def test_full_queue_drops_records():
+    handler = NonBlockingQueueHandler(max_size=1)
+    dropped = NonBlockingQueueHandler.dropped
+    handler.handle(record())
+    handler.handle(record())
+    assert handler.queue.qsize() == 1
+    assert NonBlockingQueueHandler.dropped == dropped + 1
+
+
+def test_setup_logging_reads_the_env(monkeypatch, capsys, restore_logging):
+    monkeypatch.setenv("LOG_LEVEL", "debug")
+    monkeypatch.setenv("LOG_LEVELS", "nexus.quiet=warning")
+    monkeypatch.setenv("LOG_PAYLOAD_MAX_CHARS", "3")
+    monkeypatch.setenv("LOG_SAMPLE_RATES", "event=0")
+    setup_logging("events")
+
+    logging.getLogger("nexus.loud").debug("payload %s", Payload("abcdef"))
+    logging.getLogger("nexus.quiet").info("not written")
+    logging.getLogger("nexus.loud").info("sampled out", extra={"sample": "event"})
+    logs._listener.stop()
+    logs._listener = None
+
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len(lines) == 1
+    assert lines[0]["service"] == "events"
+    assert lines[0]["level"] == "DEBUG"
+    assert lines[0]["msg"].startswith("payload abc... [6 chars")
+
+
+def test_text_format(monkeypatch, capsys, restore_logging):
+    monkeypatch.setenv("LOG_FORMAT", "text")
+    setup_logging("tools")
+    logging.getLogger("nexus.loud").warning("plain")
+    logs._listener.stop()
+    logs._listener = None
+
+    assert capsys.readouterr().out.rstrip().endswith("WARNING nexus.loud: plain")
@@ -0,0 +1,75 @@
+"""
+tests for the static tool manifest in tools/manifest.py
+To run, execute "PYTHONPATH=src pytest tests/test_manifest.py" from `tools` directory
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+from nexus_tools.server.tools.manifest import bind_args, build_manifest, load_manifest
+
+
+def test_manifest_is_up_to_date():
+    pytest.importorskip("langchain_community")
+    assert load_manifest() == build_manifest(), (
+        "manifest.json is out of date, regenerate it with "
+        "python -m nexus_tools.server.tools.manifest"
+    )
+
+
+def test_load_manifest_does_not_import_tools():
+    code = (
+        "import sys\n"
+        "from nexus_tools.server.tools.manifest import load_manifest\n"
+        "load_manifest()\n"
+        "assert 'nexus_tools.server.tools.tools' not in sys.modules\n"
+        "assert 'langchain_community' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_bind_args_in_field_order():
+    manifest = load_manifest()
+    assert bind_args(manifest, "search", ["FastAPI tutorial", "5"]) == {
+        "query": "FastAPI tutorial",
+        "num_results": "5",
+    }
+    assert bind_args(manifest, "gemini", ["Hello"]) == {"prompt": "Hello"}
+
+
+def test_run_tool_validates_args_like_tool_use(monkeypatch):
+    pytest.importorskip("langchain_community")
+    from nexus_tools.server.tools import tools
+
+    calls = []
+
+    class FakeTool:
+        def _run(self, **kwargs):
+            calls.append(kwargs)
+            return "ok"
+
+    monkeypatch.setitem(tools.TOOLS, "gemini", FakeTool())
+    assert tools.run_tool("gemini", {"prompt": "Hello"}) == "ok"
+    assert calls == [{"prompt": "Hello", "model": "gemini-pro"}]
+
+    with pytest.raises(ValueError):
+        tools.run_tool("gemini", {})
+    with pytest.raises(ValueError):
+        tools.run_tool("invalid_tool", {"prompt": "Hello"})
+
+
+def test_bind_args_rejects_unknown_tool():
+    with pytest.raises(ValueError, match="Unknown tool"):
+        bind_args(load_manifest(), "invalid_tool", ["test query"])
+
+
+def test_bind_args_rejects_missing_required_arg():
+    with pytest.raises(ValueError, match="num_results"):
+        bind_args(load_manifest(), "search", ["FastAPI tutorial"])
+
+
+def test_bind_args_rejects_wrong_type():
+    with pytest.raises(ValueError, match="must be of type string"):
+        bind_args(load_manifest(), "wikipedia", [42])
@@ -0,0 +1,89 @@
+"""
+tests for routing over several Ollama hosts in controllers/pool.py
+To run, execute "PYTHONPATH=src pytest tests/test_pool.py" from `tools` directory
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from nexus_tools.server.controllers.pool import BackendPool, Host, NoBackendAvailable
+
+
+class FakeClient:
+    def __init__(self, name, fail=False):
+        self.name = name
+        self.fail = fail
+
+    async def chat(self):
+        if self.fail:
+            raise httpx.ConnectError("connection refused")
+        return self.name
+
+    async def stream(self):
+        if self.fail:
+            raise httpx.ConnectError("connection refused")
+
+        async def chunks():
+            yield self.name
+            yield "done"
+
+        return chunks()
+
+
+def make_pool(*hosts):
+    pool = BackendPool([host for host, _ in hosts])
+    for host, client in hosts:
+        host.backend = client
+    return pool
+
+
+def test_prefers_hosts_with_the_model_loaded_then_least_loaded():
+    a, b, c = Host("a"), Host("b"), Host("c", {"other"})
+    pool = make_pool((a, None), (b, None), (c, None))
+    b.resident = {"llama3:latest"}
+    assert pool.pick("llama3").url == "b"
+    b.in_flight = 3
+    assert pool.pick("llama3").url == "b"
+    assert pool.pick("mistral").url == "a"
+    a.in_flight = 5
+    assert pool.pick("mistral").url == "b"
+    assert pool.pick("other").url == "c"
+
+
+def test_no_host_serves_the_model():
+    pool = make_pool((Host("a", {"llama3"}), None))
+    with pytest.raises(NoBackendAvailable):
+        pool.pick("mistral")
+
+
+def test_fails_over_to_another_host():
+    down, up = Host("down"), Host("up")
+    down.latency_s, up.latency_s = 0.1, 10.0
+    pool = make_pool((down, FakeClient("down", fail=True)), (up, FakeClient("up")))
+
+    assert asyncio.run(pool.run("llama3", lambda host: host.backend.chat())) == "up"
+    assert not down.healthy
+    assert down.failures == 1
+    assert down.in_flight == 0
+
+
+def test_stream_fails_over_before_first_chunk():
+    down, up = Host("down"), Host("up")
+    down.latency_s, up.latency_s = 0.1, 10.0
+    pool = make_pool((down, FakeClient("down", fail=True)), (up, FakeClient("up")))
+
+    async def run():
+        return [
+            chunk
+            async for chunk in pool.stream("llama3", lambda host: host.backend.stream())
+        ]
+
+    assert asyncio.run(run()) == ["up", "done"]
+
+
+def test_raises_when_every_host_fails():
+    pool = make_pool((Host("a"), FakeClient("a", fail=True)))
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(pool.run("llama3", lambda host: host.backend.chat()))
@@ -0,0 +1,33 @@
+"""
+tests for the prompt prefix accounting in controllers/prefix.py
+To run, execute "PYTHONPATH=src pytest tests/test_prefix.py" from `tools` directory
+"""
+
+from nexus_tools.server.controllers.prefix import PrefixTracker
+
+CONTEXT = "user: Plan a trip to Lisbon\nassistant: Sure, here is a plan.\n" * 4
+
+
+def test_shared_prefix_per_key():
+    tracker = PrefixTracker(min_prefix_chars=16)
+    assert tracker.observe("llama3", CONTEXT + "\n\nTask: one", "cluster-1") == 0
+    assert tracker.observe("llama3", CONTEXT + "\n\nTask: two", "cluster-2") == 0
+    shared = tracker.observe("llama3", CONTEXT + "\n\nTask: three", "cluster-1")
+    assert shared == len(CONTEXT + "\n\nTask: ")
+
+
+def test_short_common_beginnings_do_not_count():
+    tracker = PrefixTracker(min_prefix_chars=16)
+    tracker.observe("llama3", "Write a poem", None)
+    assert tracker.observe("llama3", "Write a story", None) == 0
+
+
+def test_estimates_saved_prompt_tokens():
+    tracker = PrefixTracker()
+    cold = "x" * 1000
+    tracker.record("llama3", cold, 0, 250)
+    tracker.record("llama3", cold + "y" * 100, 1000, 30)
+    stats = tracker.stats()["llama3"]
+    assert stats["tokens_per_char"] == 0.25
+    assert stats["shared_prefix_requests"] == 1
+    assert stats["prompt_eval_tokens_saved"] == 275 - 30
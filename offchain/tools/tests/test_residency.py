@@ -0,0 +1,111 @@
+"""
+tests for the model residency manager in controllers/residency.py
+To run, execute "PYTHONPATH=src pytest tests/test_residency.py" from `tools` directory
+"""
+
+import asyncio
+import time
+
+from nexus_tools.server.controllers.context import ContextBuckets
+from nexus_tools.server.controllers.inference import Inference
+from nexus_tools.server.controllers.pool import BackendPool, Host
+from nexus_tools.server.controllers.residency import ResidencyManager
+from nexus_tools.server.controllers.scheduler import Scheduler
+from nexus_tools.server.controllers.semantic_cache import OllamaEmbedder
+
+
+class FakeOllama:
+    def __init__(self, resident):
+        self.resident = dict(resident)
+        self.calls = []
+
+    async def ps(self):
+        return {
+            "models": [
+                {"model": model, "size": size} for model, size in self.resident.items()
+            ]
+        }
+
+    async def generate(self, model, keep_alive):
+        self.calls.append((model, keep_alive))
+        if keep_alive == 0:
+            self.resident.pop(model, None)
+        else:
+            self.resident[model] = 1
+
+
+class FakeInference:
+    def __init__(self, client):
+        host = Host("http://ollama:11434")
+        host.backend = client
+        self.pool = BackendPool([host])
+        self.scheduler = Scheduler()
+        self.context = ContextBuckets()
+
+
+def make_manager(resident, **kwargs):
+    client = FakeOllama(resident)
+    return ResidencyManager(FakeInference(client), **kwargs), client
+
+
+def test_pinned_models_are_kept_forever():
+    manager, _ = make_manager({}, pinned_models={"llama3"})
+    assert manager.keep_alive_for("llama3:latest") == -1
+    assert manager.keep_alive_for("mistral") == "30m"
+
+
+def test_refresh_reloads_pinned_and_unloads_idle_models():
+    manager, client = make_manager(
+        {"mistral:latest": 1, "phi3:latest": 1},
+        pinned_models={"llama3.2:1b"},
+        idle_evict_s=60,
+    )
+    manager.record_use("phi3")
+    manager._last_used["mistral:latest"] = time.monotonic() - 120
+    asyncio.run(manager.refresh())
+    assert set(client.resident) == {"llama3.2:1b", "phi3:latest"}
+    assert manager.evictions == 1
+
+
+def test_models_used_by_others_are_idle_from_first_sight():
+    manager, client = make_manager(
+        {"mistral:latest": 1}, pinned_models=set(), idle_evict_s=60
+    )
+    asyncio.run(manager.refresh())
+    assert set(client.resident) == {"mistral:latest"}
+    assert manager.evictions == 0
+
+    manager._last_used["mistral:latest"] -= 120
+    asyncio.run(manager.refresh())
+    assert client.resident == {}
+
+
+def test_embedding_requests_count_as_use():
+    inference = Inference(pool=BackendPool([Host("stub://")]))
+    inference.residency = ResidencyManager(inference, pinned_models=set())
+    embedder = OllamaEmbedder(inference, "nomic-embed-text")
+
+    async def run():
+        await inference.start()
+        await embedder("What is the capital of France?")
+        await inference.close()
+
+    asyncio.run(run())
+    assert inference.residency._requests == {"nomic-embed-text:latest": 1}
+
+
+def test_memory_pressure_unloads_coldest_first(monkeypatch):
+    monkeypatch.setattr(
+        "nexus_tools.server.controllers.residency.available_memory_bytes",
+        lambda: 100,
+    )
+    manager, client = make_manager(
+        {"mistral:latest": 500, "phi3:latest": 500},
+        pinned_models=set(),
+        min_free_bytes=400,
+    )
+    manager.record_use("mistral")
+    manager.record_use("phi3")
+    manager._last_used["mistral:latest"] = time.monotonic() - 10
+    asyncio.run(manager.refresh())
+    assert set(client.resident) == {"phi3:latest"}
@@ -0,0 +1,98 @@
+"""
+tests for the admission control of inference requests in controllers/scheduler.py
+To run, execute "PYTHONPATH=src pytest tests/test_scheduler.py" from `tools` directory
+"""
+
+import asyncio
+
+import pytest
+
+from nexus_tools.server.controllers.scheduler import QueueFull, Scheduler
+
+
+async def hold(scheduler, model, order, release):
+    async with scheduler.slot(model):
+        order.append(model)
+        await release.wait()
+
+
+def test_limits_concurrency_per_model():
+    async def run():
+        scheduler = Scheduler(capacity=4, model_concurrency=2)
+        running, peak = [0], [0]
+
+        async def request():
+            async with scheduler.slot("a"):
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+                await asyncio.sleep(0.01)
+                running[0] -= 1
+
+        await asyncio.gather(*(request() for _ in range(6)))
+        return peak[0], scheduler.stats()
+
+    peak, stats = asyncio.run(run())
+    assert peak == 2
+    assert stats["models"]["a"]["granted"] == 6
+    assert stats["running"] == 0
+
+
+def test_rejects_when_queue_is_full():
+    async def run():
+        scheduler = Scheduler(capacity=1, max_queue=1)
+        release = asyncio.Event()
+        order = []
+        first = asyncio.create_task(hold(scheduler, "a", order, release))
+        queued = asyncio.create_task(hold(scheduler, "a", order, release))
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFull) as e:
+            async with scheduler.slot("a"):
+                pass
+        release.set()
+        await asyncio.gather(first, queued)
+        return e.value, scheduler.stats()
+
+    error, stats = asyncio.run(run())
+    assert error.retry_after_s >= 1
+    assert stats["models"]["a"]["rejected"] == 1
+
+
+def test_burst_on_one_model_does_not_starve_another():
+    async def run():
+        scheduler = Scheduler(capacity=1)
+        release = asyncio.Event()
+        order = []
+        tasks = [asyncio.create_task(hold(scheduler, "a", order, release))]
+        await asyncio.sleep(0)
+        tasks += [
+            asyncio.create_task(hold(scheduler, "a", order, release)) for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(hold(scheduler, "b", order, release)))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*tasks)
+        return order
+
+    # b alternates with a instead of waiting for the whole burst
+    assert asyncio.run(run()) == ["a", "a", "b", "a", "a"]
+
+
+def test_cancelled_waiter_frees_its_place():
+    async def run():
+        scheduler = Scheduler(capacity=1)
+        release = asyncio.Event()
+        order = []
+        first = asyncio.create_task(hold(scheduler, "a", order, release))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(hold(scheduler, "a", order, release))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        release.set()
+        await first
+        await asyncio.gather(waiting, return_exceptions=True)
+        return scheduler.stats()
+
+    stats = asyncio.run(run())
+    assert stats["running"] == 0
+    assert stats["models"]["a"]["queued"] == 0
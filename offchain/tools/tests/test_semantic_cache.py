@@ -0,0 +1,69 @@
+"""
+tests for the semantic completion cache in controllers/semantic_cache.py
+To run, execute "PYTHONPATH=src pytest tests/test_semantic_cache.py" from `tools` directory
+"""
+
+import asyncio
+
+from nexus_tools.server.controllers.backends import StubEmbedder
+from nexus_tools.server.controllers.semantic_cache import SemanticCache
+
+OPTIONS = {"temperature": 0, "num_predict": 100}
+
+
+def make_cache(**kwargs):
+    return SemanticCache(StubEmbedder(), {"llama3.2:1b"}, **kwargs)
+
+
+def test_near_duplicate_prompt_hits():
+    async def run():
+        cache = make_cache(threshold=0.95)
+        vector = await cache.embed("What is the capital of France?")
+        cache.add("llama3.2:1b", OPTIONS, vector, {"content": "Paris"})
+
+        similar = await cache.embed("what is the capital of  France")
+        different = await cache.embed("Write a poem about the sea")
+        return (
+            cache.lookup("llama3.2:1b", OPTIONS, similar),
+            cache.lookup("llama3.2:1b", OPTIONS, different),
+            cache.lookup("llama3.2:1b", {"temperature": 1}, similar),
+            cache.stats(),
+        )
+
+    similar, different, other_options, stats = asyncio.run(run())
+    assert similar == {"content": "Paris"}
+    assert different is None
+    assert other_options is None
+    assert stats["llama3.2:1b"]["hits"] == 1
+    assert stats["llama3.2:1b"]["lookups"] == 3
+    assert stats["llama3.2:1b"]["mean_hit_similarity"] > 0.95
+
+
+def test_opt_in_per_model():
+    cache = make_cache()
+    assert cache.enabled_for("llama3.2:1b")
+    assert not cache.enabled_for("mistral")
+
+
+def test_evicts_least_recently_used():
+    async def run():
+        cache = make_cache(max_entries=2)
+        prompts = ["first prompt here", "second one, other", "third, unrelated"]
+        vectors = [await cache.embed(prompt) for prompt in prompts]
+        cache.add("llama3.2:1b", OPTIONS, vectors[0], {"n": 0})
+        cache.add("llama3.2:1b", OPTIONS, vectors[1], {"n": 1})
+        cache.lookup("llama3.2:1b", OPTIONS, vectors[0])
+        cache.add("llama3.2:1b", OPTIONS, vectors[2], {"n": 2})
+        return [cache.lookup("llama3.2:1b", OPTIONS, vector) for vector in vectors]
+
+    assert asyncio.run(run()) == [{"n": 0}, None, {"n": 2}]
+
+
+def test_expired_entries_are_not_served():
+    async def run():
+        cache = make_cache(ttl_s=0)
+        vector = await cache.embed("What is the capital of France?")
+        cache.add("llama3.2:1b", OPTIONS, vector, {"content": "Paris"})
+        return cache.lookup("llama3.2:1b", OPTIONS, vector)
+
+    assert asyncio.run(run()) is None
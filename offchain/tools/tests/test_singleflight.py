@@ -0,0 +1,98 @@
+"""
+tests for coalescing identical requests in controllers/singleflight.py
+To run, execute "PYTHONPATH=src pytest tests/test_singleflight.py" from `tools` directory
+"""
+
+import asyncio
+
+import pytest
+
+from nexus_tools.server.controllers.inference import Inference
+from nexus_tools.server.controllers.pool import BackendPool, Host
+from nexus_tools.server.controllers.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_run():
+    calls = []
+
+    async def run():
+        flight = SingleFlight()
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "done"
+
+        results = await asyncio.gather(*(flight.run("k", call) for _ in range(5)))
+        again = await flight.run("k", call)
+        return results, again, flight.stats()
+
+    results, again, stats = asyncio.run(run())
+    assert results == ["done"] * 5
+    assert again == "done"
+    assert len(calls) == 2
+    assert stats == {"in_flight": 0, "leaders": 2, "coalesced": 4}
+
+
+def test_errors_reach_every_caller():
+    async def run():
+        flight = SingleFlight()
+
+        async def call():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        return await asyncio.gather(
+            flight.run("k", call), flight.run("k", call), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_cancelled_caller_leaves_the_others_waiting():
+    async def run():
+        flight = SingleFlight()
+
+        async def call():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        first = asyncio.create_task(flight.run("k", call))
+        second = asyncio.create_task(flight.run("k", call))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+        third = asyncio.create_task(flight.run("k", call))
+        await asyncio.sleep(0.01)
+        third.cancel()
+        second_result = await second
+        return second_result, flight.stats()
+
+    result, stats = asyncio.run(run())
+    assert result == "done"
+    assert stats["leaders"] == 1
+
+
+def test_only_deterministic_or_opted_in_requests_are_coalesced():
+    inference = Inference(pool=BackendPool([Host("stub://")]))
+
+    async def run():
+        await inference.start()
+        inference.pool.hosts[0].backend.latency_s = 0.02
+        await asyncio.gather(
+            *(inference.prompt("Hello", "llama3", temperature=0) for _ in range(3)),
+            *(inference.prompt("Hello", "llama3", temperature=0.7) for _ in range(2)),
+            *(
+                inference.prompt("Hi", "llama3", temperature=0.7, coalesce=True)
+                for _ in range(2)
+            ),
+        )
+        await inference.close()
+
+    asyncio.run(run())
+    assert inference.singleflight.stats()["leaders"] == 2
+    assert inference.singleflight.stats()["coalesced"] == 3
+    assert inference.pool.hosts[0].requests == 4
@@ -0,0 +1,57 @@
+"""
+tests for the NDJSON stream of /predict/stream in controllers/streaming.py
+To run, execute "PYTHONPATH=src pytest tests/test_streaming.py" from `tools` directory
+"""
+
+import asyncio
+import json
+
+from nexus_tools.server.controllers.streaming import ndjson_stream
+
+
+async def chunks(*items, fail=False):
+    for item in items:
+        yield item
+    if fail:
+        raise ConnectionError("ollama went away")
+
+
+def collect(stream):
+    async def run():
+        return [json.loads(line) async for line in stream]
+
+    return asyncio.run(run())
+
+
+def test_tokens_then_summary():
+    records = collect(
+        ndjson_stream(
+            chunks(
+                {"message": {"role": "assistant", "content": "Hel"}},
+                {"message": {"role": "assistant", "content": "lo"}},
+                {
+                    "message": {"role": "assistant", "content": ""},
+                    "done": True,
+                    "prompt_eval_count": 12,
+                    "eval_count": 2,
+                    "eval_duration": 1000,
+                },
+            )
+        )
+    )
+    assert records[0] == {"type": "token", "content": "Hel"}
+    assert records[1] == {"type": "token", "content": "lo"}
+    done = records[2]
+    assert done["type"] == "done"
+    assert done["prompt_eval_count"] == 12
+    assert done["eval_count"] == 2
+    assert done["eval_duration"] == 1000
+    assert done["ttft_ms"] <= done["total_ms"]
+
+
+def test_error_midway():
+    records = collect(ndjson_stream(chunks({"message": {"content": "Hel"}}, fail=True)))
+    assert records == [
+        {"type": "token", "content": "Hel"},
+        {"type": "error", "detail": "ollama went away"},
+    ]
@@ -0,0 +1,56 @@
+"""
+tests for the usage metrics in controllers/usage.py
+To run, execute "PYTHONPATH=src pytest tests/test_usage.py" from `tools` directory
+"""
+
+import asyncio
+
+from nexus_tools.server.controllers.inference import Inference
+from nexus_tools.server.controllers.pool import BackendPool, Host
+from nexus_tools.server.controllers.usage import UsageMetrics, usage_of
+
+COLD = {
+    "prompt_eval_count": 100,
+    "eval_count": 50,
+    "load_duration": 2_000_000_000,
+    "prompt_eval_duration": 500_000_000,
+    "eval_duration": 1_000_000_000,
+}
+WARM = dict(COLD, load_duration=5_000_000, eval_duration=500_000_000)
+
+
+def test_usage_of_skips_missing_fields():
+    assert usage_of({"eval_count": 3, "message": {}}) == {"eval_count": 3}
+
+
+def test_aggregates_tokens_throughput_and_loads():
+    usage = UsageMetrics()
+    usage.record("llama3", COLD)
+    usage.record("llama3", WARM)
+    usage.record("llama3", {"message": {"content": "no usage reported"}})
+    stats = usage.stats()["llama3"]
+
+    assert stats["requests"] == 2
+    assert stats["prompt_tokens"] == 200
+    assert stats["eval_tokens"] == 100
+    assert stats["prompt_tokens_per_s"] == 200
+    assert round(stats["eval_tokens_per_s"], 3) == round(100 / 1.5, 3)
+    assert stats["loads"] == 1
+    assert stats["load_s"]["buckets"]["le_0.1"] == 1
+    assert stats["load_s"]["buckets"]["le_2"] == 1
+    assert stats["eval_tokens_per_s_per_request"]["buckets"]["le_50"] == 1
+    assert stats["eval_tokens_per_s_per_request"]["buckets"]["le_100"] == 1
+
+
+def test_inference_records_generated_completions_only():
+    inference = Inference(pool=BackendPool([Host("stub://")]))
+
+    async def run():
+        await inference.prompt("Hello", "llama3", temperature=0.5)
+        chunks = inference.stream("Hello", "llama3")
+        async for _ in chunks:
+            pass
+        await inference.close()
+
+    asyncio.run(run())
+    assert inference.usage.stats()["llama3"]["requests"] == 2